@@ -7,10 +7,13 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from jose import JWTError, jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import hashlib
 import os
+import time
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 load_dotenv()
 
@@ -25,12 +28,86 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-    raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
+# Pooled async client for Supabase Auth (GoTrue), so logins never block the event loop
+AUTH_POOL_SIZE = int(os.getenv("SUPABASE_AUTH_POOL_SIZE", "10"))
+AUTH_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_AUTH_TIMEOUT_SECONDS", "10"))
+# Verified token claims kept in memory, so protected requests skip re-decoding the JWT
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+# Created on first login, so importing this module needs no credentials
+auth_client: httpx.AsyncClient | None = None
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+class TokenClaimsCache:
+    """Bounded LRU of verified token claims, keyed by token hash and kept until the token expires"""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # Hash so raw bearer tokens are never held as cache keys
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> dict | None:
+        """Cached claims for token, or None when missing or expired"""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def set(self, token: str, claims: dict):
+        """Remember claims until the token's exp"""
+        expires_at = claims.get("exp")
+        if expires_at is None:
+            return
+        key = self._key(token)
+        self._entries[key] = (float(expires_at), claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+token_cache = TokenClaimsCache()
+
+def verify_token_claims(token: str) -> dict | None:
+    """Claims of a valid, unexpired token (cached), or None when it doesn't verify"""
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        token_cache.set(token, claims)
+    return claims
+
+def get_auth_client() -> httpx.AsyncClient:
+    """Shared auth client, created on first use"""
+    global auth_client
+    if auth_client is None:
+        if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+            raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
+        auth_client = httpx.AsyncClient(
+            base_url=f"{SUPABASE_URL}/auth/v1",
+            headers={"apikey": SUPABASE_ANON_KEY},
+            limits=httpx.Limits(max_connections=AUTH_POOL_SIZE, max_keepalive_connections=AUTH_POOL_SIZE),
+            timeout=AUTH_TIMEOUT_SECONDS
+        )
+    return auth_client
+
+async def close_auth_client():
+    """Release pooled auth connections (called on app shutdown)"""
+    global auth_client
+    if auth_client is not None:
+        await auth_client.aclose()
+        auth_client = None
+
 # Models
 class Token(BaseModel):
     access_token: str
@@ -48,17 +125,24 @@ class User(BaseModel):
 # Helper functions
 async def authenticate_user(email: str, password: str) -> User | None:
     """Authenticate user with Supabase"""
+    # Outside the try: missing configuration should surface as an error, not a failed login
+    client = get_auth_client()
     try:
-        # Authenticate with Supabase
-        response = supabase.auth.sign_in_with_password({
-            "email": email,
-            "password": password
-        })
+        # Password grant against Supabase Auth; 400 means wrong credentials
+        response = await client.post(
+            "/token",
+            params={"grant_type": "password"},
+            json={"email": email, "password": password}
+        )
+        if response.status_code in (400, 401):
+            return None
+        response.raise_for_status()
 
-        if response.user:
+        user = response.json().get("user")
+        if user:
             return User(
-                email=response.user.email,
-                id=response.user.id
+                email=user["email"],
+                id=user.get("id")
             )
 
         return None
@@ -88,18 +172,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-
-        if email is None:
-            raise credentials_exception
-
-        token_data = TokenData(email=email)
+    payload = verify_token_claims(token)
+    if payload is None:
+        raise credentials_exception
 
-    except JWTError:
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
 
+    token_data = TokenData(email=email)
+
     return User(email=token_data.email)
 
 # Routes
@@ -0,0 +1,62 @@
+"""
+Background database heartbeat for liveness/readiness probes
+Probes read the last heartbeat result instead of querying the database themselves
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+HEARTBEAT_INTERVAL_SECONDS = float(os.getenv('HEALTH_HEARTBEAT_SECONDS', '15'))
+# A worker stays ready through a couple of missed beats before reporting unready
+HEARTBEAT_MAX_AGE_SECONDS = float(os.getenv('HEALTH_HEARTBEAT_MAX_AGE_SECONDS', '45'))
+
+
+class DatabaseHeartbeat:
+    """Periodically run a cheap database check and remember the outcome"""
+
+    def __init__(
+        self,
+        check: Callable[[], Awaitable[None]],
+        interval_seconds: float = HEARTBEAT_INTERVAL_SECONDS,
+        max_age_seconds: float = HEARTBEAT_MAX_AGE_SECONDS
+    ):
+        self.check = check
+        self.interval_seconds = interval_seconds
+        self.max_age_seconds = max_age_seconds
+        self.last_success: Optional[float] = None
+        self.last_checked_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    async def beat(self):
+        """Run the check once and record the result"""
+        try:
+            await self.check()
+            self.last_success = time.monotonic()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Database heartbeat failed: {e}")
+        self.last_checked_at = datetime.utcnow().isoformat()
+
+    async def run(self):
+        """Beat forever (started from the app lifespan)"""
+        while True:
+            await self.beat()
+            await asyncio.sleep(self.interval_seconds)
+
+    def is_ready(self) -> bool:
+        """True when the last successful check is recent enough"""
+        if self.last_success is None:
+            return False
+        return (time.monotonic() - self.last_success) <= self.max_age_seconds
+
+    def status(self) -> Dict:
+        """Heartbeat details for the health endpoints"""
+        return {
+            'database': 'connected' if self.is_ready() else 'unavailable',
+            'last_checked_at': self.last_checked_at,
+            'error': self.last_error
+        }
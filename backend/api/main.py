@@ -1,8 +1,14 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
 from datetime import datetime, timedelta
+import csv
+import io
+import json
 import os
 from dotenv import load_dotenv
 
@@ -10,17 +16,77 @@ from dotenv import load_dotenv
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.db_manager_supabase import DatabaseManager
-from api.auth import router as auth_router
+from database.db_manager_async import MAX_PRODUCTS_PAGE_SIZE, AsyncDatabaseManager
+from api.auth import close_auth_client, router as auth_router
+from api.health import DatabaseHeartbeat
+from api.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, instrument_methods, render_metrics
+from api.price_stream import PriceChangeHub
+from api.rate_limit import RateLimitMiddleware
+from api.singleflight import SingleFlight
+from api.schemas import (
+    LatestPricesResponse,
+    ProductDetail,
+    ProductListResponse,
+    ProductsBatchResponse,
+    ScraperLogsResponse,
+)
 
 load_dotenv()
 
+# Database manager (async, so DB calls never block the event loop).
+# Created in the lifespan hook, so importing this module needs no network or credentials
+db_manager: Optional[AsyncDatabaseManager] = None
+
+# Load the price snapshot and dashboard stats before the worker starts serving
+WARM_UP_ON_STARTUP = os.getenv('WARM_UP_ON_STARTUP', 'false').lower() == 'true'
+
+async def check_database():
+    """Heartbeat check: a trivial query, plus keeping the dashboard stats cache warm"""
+    await db_manager.ping()
+    await db_manager.get_dashboard_stats()
+
+heartbeat = DatabaseHeartbeat(check_database)
+
+# Fans snapshot price changes out to /api/stream/prices clients
+price_hub = PriceChangeHub()
+
+async def warm_up():
+    """Fill the read caches and record a first heartbeat, so the worker is ready as soon as it serves"""
+    try:
+        await db_manager.get_latest_prices(limit=1)
+    except Exception as e:
+        print(f"Cache warm-up failed: {e}")
+    await heartbeat.beat()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the database client, run the heartbeat and release pooled connections on shutdown"""
+    global db_manager
+    db_manager = instrument_methods(AsyncDatabaseManager())
+    price_hub.attach(db_manager.price_cache)
+    if WARM_UP_ON_STARTUP:
+        await warm_up()
+    heartbeat_task = asyncio.create_task(heartbeat.run())
+    stream_task = asyncio.create_task(price_hub.run(db_manager.refresh_latest_prices))
+    yield
+    heartbeat_task.cancel()
+    stream_task.cancel()
+    price_hub.detach()
+    await db_manager.close()
+    await close_auth_client()
+
 app = FastAPI(
     title="MobiMEA Intelligence Platform API",
     description="Live phone price tracking and market intelligence for Mauritius",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson encodes the large price lists several times faster than the stdlib encoder
+    default_response_class=ORJSONResponse
 )
 
+# Per-client rate limiting; added first so CORS headers still reach 429 responses
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware - allow frontend to connect
 app.add_middleware(
     CORSMiddleware,
@@ -40,8 +106,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database manager
-db_manager = DatabaseManager()
+# Per-route latency, in-flight and status metrics, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Upper bound for /api/products/batch, enough for any comparison page
+MAX_BATCH_SLUGS = 20
+
+# Concurrent requests for the same product share one database lookup
+product_lookups = SingleFlight()
+
+async def get_product_coalesced(slug: str) -> Optional[Dict]:
+    """get_product_by_slug, coalesced across concurrent requests (result is shared, don't mutate it)"""
+    return await product_lookups.do(slug, lambda: db_manager.get_product_by_slug(slug))
 
 # Include authentication router
 app.include_router(auth_router)
@@ -55,19 +131,36 @@ async def root():
         "status": "online"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/api/health")
 async def health_check():
-    """Detailed health check"""
-    try:
-        stats = db_manager.get_dashboard_stats()
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "last_scrape": stats.get('last_scrape_time'),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Service unhealthy: {str(e)}")
+    """Detailed health check (served from the heartbeat and stats cache, no DB query)"""
+    if not heartbeat.is_ready():
+        raise HTTPException(status_code=503, detail=f"Service unhealthy: {heartbeat.last_error or 'database not reachable yet'}")
+
+    stats = db_manager.get_cached_dashboard_stats() or {}
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "last_scrape": stats.get('last_scrape_time'),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness probe: the worker is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness probe: the last background database heartbeat succeeded recently"""
+    if not heartbeat.is_ready():
+        return ORJSONResponse(status_code=503, content={"status": "unready", **heartbeat.status()})
+    return {"status": "ready", **heartbeat.status()}
 
 # ========================================
 # DASHBOARD ENDPOINTS
@@ -77,16 +170,16 @@ async def health_check():
 async def get_dashboard_stats():
     """Get overall statistics for CEO dashboard"""
     try:
-        stats = db_manager.get_dashboard_stats()
+        stats = await db_manager.get_dashboard_stats()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/dashboard/latest-prices")
+@app.get("/api/dashboard/latest-prices", response_model=LatestPricesResponse)
 async def get_latest_prices(limit: int = 50):
     """Get latest prices across all products and retailers"""
     try:
-        prices = db_manager.get_latest_prices(limit=limit)
+        prices = await db_manager.get_latest_prices(limit=limit)
         return {
             "count": len(prices),
             "prices": prices
@@ -98,45 +191,65 @@ async def get_latest_prices(limit: int = 50):
 # PRODUCT ENDPOINTS
 # ========================================
 
-@app.get("/api/products")
-async def list_all_products(limit: int = 100, brand: Optional[str] = None):
-    """List all products with their basic info and specifications"""
+@app.get("/api/products", response_model=ProductListResponse)
+async def list_all_products(
+    # Larger limits are clamped to MAX_PRODUCTS_PAGE_SIZE; follow next_cursor for the rest
+    limit: int = Query(MAX_PRODUCTS_PAGE_SIZE, ge=1),
+    cursor: Optional[int] = None,
+    brand: Optional[str] = None,
+    retailer: Optional[str] = None,
+    in_stock: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None
+):
+    """List products with their best price, filtered and paginated by cursor"""
+    try:
+        result = await db_manager.list_products(
+            limit=limit,
+            cursor=cursor,
+            brand=brand,
+            retailer=retailer,
+            in_stock=in_stock,
+            min_price=min_price,
+            max_price=max_price
+        )
+        return {
+            'count': len(result['products']),
+            'products': result['products'],
+            'next_cursor': result['next_cursor']
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/products/batch", response_model=ProductsBatchResponse)
+async def get_products_batch(slugs: str = Query(..., description="Comma-separated product slugs")):
+    """Get detailed product information for several products in one call"""
     try:
-        prices = db_manager.get_latest_prices(limit=limit)
-
-        # Get unique products (group by product_id)
-        products_dict = {}
-        for price in prices:
-            product_id = price['product_id']
-            if brand and price['brand'].lower() != brand.lower():
-                continue
-
-            if product_id not in products_dict:
-                products_dict[product_id] = {
-                    'id': product_id,
-                    'name': price['product_name'],
-                    'brand': price['brand'],
-                    'model': price['model'],
-                    'slug': price['slug'],
-                    'best_price': price['price_cash'],
-                    'retailer': price['retailer_name'],
-                    'in_stock': price['in_stock'],
-                    'url': price.get('url')
-                }
-
-        products = list(products_dict.values())
+        requested = list(dict.fromkeys(s.strip() for s in slugs.split(',') if s.strip()))
+
+        if not requested:
+            raise HTTPException(status_code=400, detail="No slugs given")
+        if len(requested) > MAX_BATCH_SLUGS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SLUGS} slugs per request")
+
+        products = await db_manager.get_products_by_slugs(requested)
+        found = {product['slug'] for product in products}
+
         return {
             'count': len(products),
-            'products': products
+            'products': products,
+            'missing': [slug for slug in requested if slug not in found]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/products/{slug}")
+@app.get("/api/products/{slug}", response_model=ProductDetail)
 async def get_product_details(slug: str):
     """Get detailed product information with all retailer prices"""
     try:
-        product = db_manager.get_product_by_slug(slug)
+        product = await get_product_coalesced(slug)
 
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
@@ -151,7 +264,7 @@ async def get_product_details(slug: str):
 async def get_best_price(slug: str):
     """Get the best current price for a product"""
     try:
-        product = db_manager.get_product_by_slug(slug)
+        product = await get_product_coalesced(slug)
 
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
@@ -187,16 +300,27 @@ async def get_best_price(slug: str):
 # ========================================
 
 @app.get("/api/products/{slug}/price-history")
-async def get_price_history(slug: str, days: int = 30, retailer: Optional[str] = None):
-    """Get price history for a product"""
+async def get_price_history(
+    slug: str,
+    days: int = Query(30, ge=1, le=3650),
+    retailer: Optional[str] = None,
+    max_points: int = Query(300, ge=3, le=5000)
+):
+    """Get downsampled price history for a product"""
     try:
-        # TODO: Implement with Supabase - returning empty for now
+        result = await db_manager.get_price_history(
+            slug,
+            days=days,
+            retailer=retailer,
+            max_points=max_points
+        )
         return {
             'product_slug': slug,
             'days': days,
             'retailer_filter': retailer,
-            'history': [],
-            'statistics': None
+            'bucket_seconds': result['bucket_seconds'],
+            'history': result['history'],
+            'statistics': result['statistics']
         }
     except HTTPException:
         raise
@@ -211,11 +335,8 @@ async def get_price_history(slug: str, days: int = 30, retailer: Optional[str] =
 async def get_active_promotions(brand: Optional[str] = None, retailer: Optional[str] = None):
     """Get all active promotions"""
     try:
-        # TODO: Implement with Supabase - returning empty for now
-        return {
-            'count': 0,
-            'promotions': []
-        }
+        result = await db_manager.get_active_promotions(brand=brand, retailer=retailer)
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -227,7 +348,7 @@ async def get_active_promotions(brand: Optional[str] = None, retailer: Optional[
 async def get_brand_comparison():
     """Compare average prices across brands"""
     try:
-        result = db_manager.get_brand_comparison()
+        result = await db_manager.get_brand_comparison()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -236,10 +357,8 @@ async def get_brand_comparison():
 async def get_retailer_comparison():
     """Compare retailers by product count and pricing"""
     try:
-        # TODO: Implement with Supabase - returning empty for now
-        return {
-            'retailers': []
-        }
+        result = await db_manager.get_retailer_comparison()
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -247,15 +366,97 @@ async def get_retailer_comparison():
 # SCRAPER STATUS ENDPOINTS
 # ========================================
 
-@app.get("/api/scrapers/logs")
+@app.get("/api/scrapers/logs", response_model=ScraperLogsResponse)
 async def get_scraper_logs(limit: int = 50):
     """Get recent scraper execution logs"""
     try:
-        result = db_manager.get_scraper_logs(limit=limit)
+        result = await db_manager.get_scraper_logs(limit=limit)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ========================================
+# BULK EXPORT ENDPOINTS
+# ========================================
+
+PRODUCT_EXPORT_FIELDS = [
+    'product_id', 'product_name', 'brand', 'model', 'slug', 'retailer_name',
+    'price_cash', 'original_price', 'in_stock', 'stock_status', 'promo_text', 'url', 'last_updated'
+]
+PRICE_EXPORT_FIELDS = [
+    'time', 'link_id', 'product_id', 'product_slug', 'retailer', 'price_cash', 'price_credit',
+    'original_price', 'currency', 'in_stock', 'stock_status', 'promo_text'
+]
+
+async def encode_export(rows: AsyncIterator[Dict], fields: List[str], fmt: str) -> AsyncIterator[str]:
+    """Encode rows one at a time as NDJSON lines or CSV records"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        yield buffer.getvalue()
+        async for row in rows:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row)
+            yield buffer.getvalue()
+    else:
+        async for row in rows:
+            yield json.dumps({field: row.get(field) for field in fields}, default=str) + '\n'
+
+def export_response(rows: AsyncIterator[Dict], fields: List[str], fmt: str, name: str) -> StreamingResponse:
+    """Stream an export as a file download"""
+    media_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    filename = f"{name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        encode_export(rows, fields, fmt),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/export/products")
+async def export_products(
+    format: str = Query('ndjson', pattern='^(ndjson|csv)$'),
+    retailer: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Stream the catalog (latest price per product and retailer) as NDJSON or CSV"""
+    rows = db_manager.export_products(retailer=retailer, start=start, end=end)
+    return export_response(rows, PRODUCT_EXPORT_FIELDS, format, 'products')
+
+@app.get("/api/export/prices")
+async def export_prices(
+    format: str = Query('ndjson', pattern='^(ndjson|csv)$'),
+    retailer: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Stream the full price history as NDJSON or CSV"""
+    rows = db_manager.export_prices(retailer=retailer, start=start, end=end)
+    return export_response(rows, PRICE_EXPORT_FIELDS, format, 'prices')
+
+# ========================================
+# LIVE PRICE STREAM
+# ========================================
+
+@app.get("/api/stream/prices")
+async def stream_prices(request: Request):
+    """
+    Server-sent events: one 'price' event per product/retailer whose price or stock changed
+    Replaces polling /api/dashboard/latest-prices
+    """
+    return StreamingResponse(
+        price_hub.stream(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 # ========================================
 # LIVE PRICING FOR COMPARISON TOOL
 # ========================================
@@ -267,21 +468,8 @@ async def get_live_price_for_phone(phone_model: str):
     Example: /api/phones/live-price/samsung-galaxy-s24
     """
     try:
-        # Search for products matching this phone model
-        # We'll look for partial matches in the product names
-        model_query = phone_model.replace('-', ' ').lower()
-
-        latest_prices = db_manager.get_latest_prices(limit=500)
-
-        # Filter to find matching products
-        matching_products = []
-        for price in latest_prices:
-            product_name_lower = price['product_name'].lower()
-            model_lower = price['model'].lower() if price['model'] else ''
-
-            # Check if model matches
-            if model_query in product_name_lower or model_query in model_lower:
-                matching_products.append(price)
+        # Hyphens in the slug-style model are treated as spaces by the index
+        matching_products = await db_manager.search_latest_prices(phone_model)
 
         # Group by variant and find best prices
         if not matching_products:
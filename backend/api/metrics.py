@@ -0,0 +1,143 @@
+"""
+Prometheus metrics for the API
+Per-route request latency, in-flight requests and status counts, plus time spent in database manager calls
+"""
+
+import functools
+import inspect
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.routing import Match
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'Time to serve a request, until its last body chunk is sent',
+    ['method', 'route']
+)
+REQUESTS_TOTAL = Counter(
+    'api_requests_total',
+    'Requests served, by response status (error rate = 5xx / total)',
+    ['method', 'route', 'status']
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'api_requests_in_flight',
+    'Requests currently being served',
+    ['method', 'route'],
+    multiprocess_mode='livesum'
+)
+DB_CALL_LATENCY = Histogram(
+    'db_call_duration_seconds',
+    'Time spent inside database manager methods',
+    ['method']
+)
+DB_CALL_ERRORS = Counter(
+    'db_call_errors_total',
+    'Database manager calls that failed, whether they raised or returned an empty result',
+    ['method']
+)
+
+# Label for requests that match no route, so stray URLs can't blow up label cardinality
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def route_template(app, scope) -> str:
+    """Path template of the route serving this request (e.g. /api/products/{slug})"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, 'path', UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware, so streamed responses are timed until the last chunk"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        route = route_template(scope['app'], scope)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUESTS_TOTAL.labels(method, route, str(status)).inc()
+            in_flight.dec()
+
+
+def _timed(name: str, fn):
+    """Wrap a coroutine or async generator method so its duration is recorded"""
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def gen_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                async for item in fn(*args, **kwargs):
+                    yield item
+            except Exception:
+                DB_CALL_ERRORS.labels(name).inc()
+                raise
+            finally:
+                DB_CALL_LATENCY.labels(name).observe(time.perf_counter() - start)
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            DB_CALL_ERRORS.labels(name).inc()
+            raise
+        finally:
+            DB_CALL_LATENCY.labels(name).observe(time.perf_counter() - start)
+    return wrapper
+
+
+def instrument_methods(manager):
+    """Time every public async method of a database manager instance and count its errors"""
+    for name, method in inspect.getmembers(manager, inspect.ismethod):
+        if name.startswith('_'):
+            continue
+        if inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method):
+            setattr(manager, name, _timed(name, method))
+    # Most methods catch their own errors, so they report them through the hook instead of raising
+    if hasattr(manager, 'error_hook'):
+        manager.error_hook = lambda name: DB_CALL_ERRORS.labels(name).inc()
+    return manager
+
+
+def render_metrics() -> bytes:
+    """Current metrics in Prometheus text format, merged across workers when multiprocess mode is on"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -0,0 +1,105 @@
+"""
+Server-sent events for live price changes
+Changes found by the shared snapshot's own refreshes feed every connected client through an in-process hub
+"""
+
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Set
+
+# How often the snapshot is checked for new prices while anyone is subscribed
+STREAM_REFRESH_SECONDS = float(os.getenv('PRICE_STREAM_REFRESH_SECONDS', '15'))
+# Comment lines sent on idle connections so proxies don't close them
+STREAM_KEEPALIVE_SECONDS = float(os.getenv('PRICE_STREAM_KEEPALIVE_SECONDS', '20'))
+# Events buffered per client; a client that falls further behind loses the oldest ones
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv('PRICE_STREAM_QUEUE_SIZE', '1000'))
+
+
+def format_event(change: Dict) -> str:
+    """One price change as an SSE message"""
+    return f"event: price\ndata: {json.dumps(change, default=str)}\n\n"
+
+
+class PriceChangeHub:
+    """Fan price changes out to every subscriber's queue, without per-subscriber queries"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._snapshot = None
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of connected clients"""
+        return len(self._subscribers)
+
+    def attach(self, snapshot):
+        """Take changes from snapshot, listening only while someone is subscribed
+
+        Diffing means decoding every row on each reload, so workers nobody
+        streams from skip it.
+        """
+        self._snapshot = snapshot
+        if self._subscribers:
+            snapshot.add_listener(self.publish)
+
+    def detach(self):
+        """Stop taking changes from the attached snapshot"""
+        if self._snapshot is not None:
+            self._snapshot.remove_listener(self.publish)
+        self._snapshot = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a new subscriber and return its event queue"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if not self._subscribers and self._snapshot is not None:
+            self._snapshot.add_listener(self.publish)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Forget a subscriber (called when its connection closes)"""
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._snapshot is not None:
+            self._snapshot.remove_listener(self.publish)
+
+    def publish(self, changes: List[Dict]):
+        """Queue changes for every subscriber (the snapshot listener while attached)"""
+        for queue in self._subscribers:
+            for change in changes:
+                if queue.full():
+                    # Slow client: drop its oldest event rather than block everyone else
+                    queue.get_nowait()
+                queue.put_nowait(change)
+
+    async def run(self, refresh: Callable[[], Awaitable[None]], interval_seconds: float = STREAM_REFRESH_SECONDS):
+        """Nudge the snapshot periodically while someone is listening
+
+        refresh only reloads when the snapshot would anyway (new snapshot
+        file, expired TTL), so streaming adds no database reads of its own.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if not self._subscribers:
+                continue
+            try:
+                await refresh()
+            except Exception as e:
+                print(f"Error refreshing prices for stream: {e}")
+
+    async def stream(self, is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+        """SSE body for one client, until it disconnects"""
+        queue = self.subscribe()
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield f"retry: {int(STREAM_REFRESH_SECONDS * 1000)}\n\n"
+            while not await is_disconnected():
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(change)
+        finally:
+            self.unsubscribe(queue)
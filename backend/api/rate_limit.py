@@ -0,0 +1,168 @@
+"""
+Per-client token-bucket rate limiting for the public API
+Clients are identified by verified user or IP; each route group has its own budget
+"""
+
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi.responses import ORJSONResponse
+
+from api.auth import verify_token_claims
+
+
+def _limit(group: str, per_minute: str, burst: str) -> Tuple[float, float]:
+    """(tokens per second, bucket size) for a route group, overridable from env"""
+    prefix = f"RATE_LIMIT_{group.upper()}"
+    return (
+        float(os.getenv(f"{prefix}_PER_MINUTE", per_minute)) / 60,
+        float(os.getenv(f"{prefix}_BURST", burst))
+    )
+
+# Route groups, matched by path prefix in order; anything else falls into 'default'
+ROUTE_GROUPS = [
+    ('live_price', '/api/phones/live-price'),
+    ('export', '/api/export'),
+]
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    'default': _limit('default', '300', '60'),
+    # Each live-price call searches the snapshot and each export streams whole tables
+    'live_price': _limit('live_price', '30', '10'),
+    'export': _limit('export', '6', '2'),
+}
+# Probes and scrapes must never be throttled
+EXEMPT_PATHS = ('/api/health', '/metrics')
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+
+
+def _networks(value: str) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    """Parse a comma-separated list of IPs/CIDRs"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(',') if item.strip()]
+
+# Reverse proxies (IPs or CIDRs) whose X-Forwarded-For is believed. Behind nginx every
+# request comes from the proxy, so without this all clients share one bucket; with the
+# backend in Docker behind host nginx, that is the bridge gateway, e.g. 172.16.0.0/12
+TRUSTED_PROXIES = _networks(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', ''))
+# Buckets kept in memory; the least recently used client is dropped first
+MAX_TRACKED_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '10000'))
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by (route group, client), refilled lazily on each request"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = RATE_LIMITS, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.limits = limits
+        self.max_clients = max_clients
+        self._buckets: OrderedDict = OrderedDict()
+
+    def acquire(self, group: str, client: str) -> float:
+        """Take one token; returns 0 when allowed, else seconds until a token is available"""
+        rate, capacity = self.limits.get(group, self.limits['default'])
+        key = (group, client)
+        now = time.monotonic()
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens, last = bucket
+            tokens = min(capacity, tokens + (now - last) * rate)
+            self._buckets.move_to_end(key)
+
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            allowed = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            allowed = (1 - tokens) / rate
+
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed
+
+
+def route_group(path: str) -> Optional[str]:
+    """Rate limit group for a path, or None when the path is exempt"""
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    for group, prefix in ROUTE_GROUPS:
+        if path.startswith(prefix):
+            return group
+    return 'default'
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    """Whether address is one of TRUSTED_PROXIES"""
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(scope) -> str:
+    """Peer address, or the client a trusted proxy forwarded for"""
+    client = scope.get('client')
+    address = client[0] if client else 'unknown'
+    if not _is_trusted_proxy(address):
+        return address
+
+    headers = dict(scope.get('headers') or [])
+    forwarded = headers.get(b'x-forwarded-for', b'').decode('latin-1')
+    # Proxies append, so the rightmost address not added by one of ours is the client;
+    # anything left of it was supplied by the client and can't be trusted
+    for hop in reversed([hop.strip() for hop in forwarded.split(',') if hop.strip()]):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return address
+
+
+def client_key(scope) -> str:
+    """Identify the caller: signed-in user when the bearer token verifies, else IP
+
+    An unverified token is ignored, so sending a random one per request
+    can't buy a fresh bucket each time.
+    """
+    headers = dict(scope.get('headers') or [])
+    authorization = headers.get(b'authorization', b'').decode('latin-1')
+    if authorization.lower().startswith('bearer '):
+        claims = verify_token_claims(authorization[7:].strip())
+        if claims and claims.get('sub'):
+            return f"user:{claims['sub']}"
+    return 'ip:' + client_ip(scope)
+
+
+class RateLimitMiddleware:
+    """Plain ASGI middleware answering over-limit requests with 429 before any route runs"""
+
+    def __init__(self, app, limiter: Optional[TokenBucketLimiter] = None):
+        self.app = app
+        self.limiter = limiter or TokenBucketLimiter()
+
+    async def __call__(self, scope, receive, send):
+        # CORS preflights are answered by the CORS middleware and cost nothing
+        if not RATE_LIMIT_ENABLED or scope['type'] != 'http' or scope['method'] == 'OPTIONS':
+            await self.app(scope, receive, send)
+            return
+
+        group = route_group(scope['path'])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = self.limiter.acquire(group, client_key(scope))
+        if retry_after:
+            response = ORJSONResponse(
+                {'detail': 'Rate limit exceeded'},
+                status_code=429,
+                headers={'Retry-After': str(math.ceil(retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,94 @@
+"""
+Response models for the heavy read endpoints
+Declaring them lets FastAPI validate and serialize rows in pydantic-core
+instead of walking every dict through jsonable_encoder
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, field_validator
+
+
+def zero_price_as_none(value):
+    """A stored price of 0 means the scraper found no price; report it as null"""
+    return value or None
+
+
+class LatestPrice(BaseModel):
+    product_id: int
+    product_name: str
+    brand: str
+    model: Optional[str] = None
+    slug: str
+    retailer_name: str
+    price_cash: Optional[float] = None
+    original_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+    stock_status: Optional[str] = None
+    promo_text: Optional[str] = None
+    url: Optional[str] = None
+    last_updated: Optional[str] = None
+
+    _no_zero_prices = field_validator('price_cash', 'original_price', mode='before')(zero_price_as_none)
+
+class LatestPricesResponse(BaseModel):
+    count: int
+    prices: List[LatestPrice]
+
+class ProductListItem(BaseModel):
+    id: int
+    name: str
+    brand: str
+    model: Optional[str] = None
+    slug: str
+    best_price: Optional[float] = None
+    retailer: Optional[str] = None
+    in_stock: Optional[bool] = None
+    url: Optional[str] = None
+
+    _no_zero_prices = field_validator('best_price', mode='before')(zero_price_as_none)
+
+class ProductListResponse(BaseModel):
+    count: int
+    products: List[ProductListItem]
+    next_cursor: Optional[int] = None
+
+class RetailerPrice(BaseModel):
+    retailer: str
+    price: Optional[float] = None
+    original_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+    stock_status: Optional[str] = None
+    promo_text: Optional[str] = None
+    url: Optional[str] = None
+    last_updated: Optional[str] = None
+
+    _no_zero_prices = field_validator('price', 'original_price', mode='before')(zero_price_as_none)
+
+class ProductDetail(BaseModel):
+    id: int
+    name: str
+    brand: str
+    model: Optional[str] = None
+    variant: Optional[str] = None
+    slug: str
+    prices: List[RetailerPrice]
+
+class ProductsBatchResponse(BaseModel):
+    count: int
+    products: List[ProductDetail]
+    missing: List[str]
+
+class ScraperLog(BaseModel):
+    id: int
+    retailer: str
+    status: Optional[str] = None
+    products_found: Optional[int] = 0
+    products_saved: Optional[int] = 0
+    errors: Optional[str] = None
+    execution_time_ms: Optional[int] = None
+    created_at: Optional[str] = None
+
+class ScraperLogsResponse(BaseModel):
+    total_count: int
+    logs: List[ScraperLog]
@@ -2,11 +2,19 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from typing import Dict, List, Optional
 from datetime import datetime
+import csv
+import io
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Columns of the per-scrape staging table, in COPY order
+STAGING_COLUMNS = [
+    'slug', 'name', 'brand', 'model', 'variant', 'url', 'scraped_name',
+    'price_cash', 'price_credit', 'original_price', 'in_stock', 'stock_status', 'promo_text'
+]
+
 class DatabaseManager:
     """Handle all database operations for the scraping system"""
 
@@ -49,12 +57,14 @@ class DatabaseManager:
                 UPDATE retailers SET last_scraped_at = NOW() WHERE id = :retailer_id
             """), {'retailer_id': retailer_id})
 
-            # Process each product
-            products_updated = 0
+            # Stage every product, then save them with a few set-based statements
+            staged = {}
             for raw_product, normalized in zip(result['products'], normalized_products):
                 if 'error' not in normalized:
-                    self._save_product_price(session, retailer_id, raw_product, normalized)
-                    products_updated += 1
+                    # One row per product per retailer: a later listing of the same product wins
+                    staged[normalized['slug']] = self._staging_row(raw_product, normalized)
+            prices_changed = self._save_product_prices(session, retailer_id, list(staged.values()))
+            products_updated = len(staged)
 
             # Update scraper log with products_saved count
             session.execute(text("""
@@ -65,7 +75,7 @@ class DatabaseManager:
             """), {'count': products_updated, 'retailer': retailer_name})
 
             session.commit()
-            print(f"Successfully saved {products_updated} products from {retailer_name}")
+            print(f"Successfully saved {products_updated} products from {retailer_name} ({prices_changed} price changes)")
 
         except Exception as e:
             session.rollback()
@@ -74,87 +84,122 @@ class DatabaseManager:
         finally:
             session.close()
 
-    def _save_product_price(self, session, retailer_id: int, raw_product: Dict, normalized: Dict):
-        """Save or update a product and its price"""
+    @staticmethod
+    def _staging_row(raw_product: Dict, normalized: Dict) -> Dict:
+        """Staging table row for one scraped product"""
+        return {
+            'slug': normalized['slug'],
+            'name': normalized['normalized_name'],
+            'brand': normalized['brand'],
+            'model': normalized['model'],
+            'variant': normalized.get('variant', ''),
+            'url': raw_product.get('url'),
+            'scraped_name': raw_product['name'],
+            'price_cash': raw_product.get('price_cash'),
+            'price_credit': raw_product.get('price_credit'),
+            'original_price': raw_product.get('original_price'),
+            'in_stock': raw_product.get('in_stock', True),
+            'stock_status': raw_product.get('stock_status', 'in_stock'),
+            'promo_text': raw_product.get('promo_text')
+        }
 
-        slug = normalized['slug']
+    def _save_product_prices(self, session, retailer_id: int, rows: List[Dict]) -> int:
+        """Save or update products, links and prices for one retailer's scrape
 
-        # Find or create product
-        product = session.execute(
-            text("SELECT id FROM products WHERE slug = :slug"),
-            {'slug': slug}
-        ).fetchone()
+        The scrape is COPYed into a temp table, then products, retailer links and
+        prices are each written by one INSERT ... SELECT, so the number of round
+        trips stays the same whether the scrape has ten products or ten thousand.
+        A price row is only written when the observation differs from the link's
+        latest one; unchanged links just get last_seen_at bumped. Rows must have
+        unique slugs. Returns the number of prices written.
+        """
+        if not rows:
+            return 0
 
-        if not product:
-            # Create new product
-            result = session.execute(text("""
+        session.execute(text("""
+            CREATE TEMP TABLE scrape_staging (
+                slug VARCHAR(255) PRIMARY KEY,
+                name VARCHAR(255),
+                brand VARCHAR(50),
+                model VARCHAR(100),
+                variant VARCHAR(100),
+                url TEXT,
+                scraped_name VARCHAR(255),
+                price_cash NUMERIC(10, 2),
+                price_credit NUMERIC(10, 2),
+                original_price NUMERIC(10, 2),
+                in_stock BOOLEAN,
+                stock_status VARCHAR(50),
+                promo_text TEXT,
+                product_id INT,
+                link_id INT
+            ) ON COMMIT DROP
+        """))
+        self._copy_rows(session, 'scrape_staging', STAGING_COLUMNS, rows)
+
+        # Products: insert new slugs, touch existing ones, and note every id
+        session.execute(text("""
+            WITH upserted AS (
                 INSERT INTO products (name, brand, model, variant, slug)
-                VALUES (:name, :brand, :model, :variant, :slug)
-                RETURNING id
-            """), {
-                'name': normalized['normalized_name'],
-                'brand': normalized['brand'],
-                'model': normalized['model'],
-                'variant': normalized.get('variant', ''),
-                'slug': slug
-            })
-            product_id = result.fetchone()[0]
-        else:
-            product_id = product[0]
-            # Update product info
-            session.execute(text("""
-                UPDATE products
+                SELECT name, brand, model, variant, slug FROM scrape_staging
+                ON CONFLICT (slug) DO UPDATE
                 SET updated_at = NOW(),
-                    variant = COALESCE(:variant, variant)
-                WHERE id = :id
-            """), {'id': product_id, 'variant': normalized.get('variant', '')})
-
-        # Find or create retailer link
-        link = session.execute(text("""
-            SELECT id FROM retailer_links
-            WHERE product_id = :product_id AND retailer_id = :retailer_id
-        """), {'product_id': product_id, 'retailer_id': retailer_id}).fetchone()
-
-        if not link:
-            result = session.execute(text("""
+                    variant = COALESCE(EXCLUDED.variant, products.variant)
+                RETURNING id, slug
+            )
+            UPDATE scrape_staging s SET product_id = u.id
+            FROM upserted u
+            WHERE s.slug = u.slug
+        """))
+
+        # Retailer links: same pattern, keyed on (product_id, retailer_id)
+        session.execute(text("""
+            WITH upserted AS (
                 INSERT INTO retailer_links (product_id, retailer_id, original_url, scraped_name)
-                VALUES (:product_id, :retailer_id, :url, :scraped_name)
-                RETURNING id
-            """), {
-                'product_id': product_id,
-                'retailer_id': retailer_id,
-                'url': raw_product.get('url'),
-                'scraped_name': raw_product['name']
-            })
-            link_id = result.fetchone()[0]
-        else:
-            link_id = link[0]
-            # Update last_seen and scraped name
-            session.execute(text("""
-                UPDATE retailer_links
+                SELECT product_id, :retailer_id, url, scraped_name FROM scrape_staging
+                ON CONFLICT (product_id, retailer_id) DO UPDATE
                 SET last_seen_at = NOW(),
-                    scraped_name = :scraped_name,
-                    original_url = COALESCE(:url, original_url)
-                WHERE id = :id
-            """), {
-                'id': link_id,
-                'scraped_name': raw_product['name'],
-                'url': raw_product.get('url')
-            })
-
-        # Insert price record (time-series data)
-        session.execute(text("""
+                    scraped_name = EXCLUDED.scraped_name,
+                    original_url = COALESCE(EXCLUDED.original_url, retailer_links.original_url)
+                RETURNING id, product_id
+            )
+            UPDATE scrape_staging s SET link_id = u.id
+            FROM upserted u
+            WHERE s.product_id = u.product_id
+        """), {'retailer_id': retailer_id})
+
+        # Prices (time-series data): only observations that changed, each compared
+        # with its link's latest row in current_prices (migration 009)
+        result = session.execute(text("""
             INSERT INTO prices (link_id, price_cash, price_credit, original_price, in_stock, stock_status, promo_text)
-            VALUES (:link_id, :price_cash, :price_credit, :original_price, :in_stock, :stock_status, :promo_text)
-        """), {
-            'link_id': link_id,
-            'price_cash': raw_product.get('price_cash'),
-            'price_credit': raw_product.get('price_credit'),
-            'original_price': raw_product.get('original_price'),
-            'in_stock': raw_product.get('in_stock', True),
-            'stock_status': raw_product.get('stock_status', 'in_stock'),
-            'promo_text': raw_product.get('promo_text')
-        })
+            SELECT s.link_id, s.price_cash, s.price_credit, s.original_price, s.in_stock, s.stock_status, s.promo_text
+            FROM scrape_staging s
+            LEFT JOIN current_prices last ON last.link_id = s.link_id
+            WHERE last.link_id IS NULL
+               OR (s.price_cash, s.price_credit, s.original_price, s.in_stock, s.stock_status, s.promo_text)
+                  IS DISTINCT FROM
+                  (last.price_cash, last.price_credit, last.original_price, last.in_stock, last.stock_status, last.promo_text)
+        """))
+        return result.rowcount
+
+    @staticmethod
+    def _copy_rows(session, table: str, columns: List[str], rows: List[Dict]):
+        """Bulk load rows into table with COPY on the session's connection"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # \N marks NULL, so empty strings stay empty strings
+            writer.writerow(['\\N' if row.get(column) is None else row.get(column) for column in columns])
+        buffer.seek(0)
+
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+        finally:
+            cursor.close()
 
     def get_latest_prices(self, limit: int = 100) -> List[Dict]:
         """Get latest prices for all products"""
@@ -0,0 +1,687 @@
+"""
+Async read-side database manager for the FastAPI process
+Talks to Supabase's PostgREST API over a pooled httpx.AsyncClient so slow
+queries never block the event loop
+"""
+
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+import math
+import os
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from database.db_manager_supabase import (
+    SNAPSHOT_PAGE_SIZE,
+    aggregate_brand_comparison,
+    format_dashboard_stats,
+    format_latest_price,
+    format_product,
+    format_scraper_log,
+)
+from database.price_cache import latest_prices_snapshot
+from database.query_cache import QueryCache
+from database.snapshot_file import PRICE_SNAPSHOT_PATH, open_snapshot
+from utils.downsampling import lttb
+
+load_dotenv()
+
+# Connections kept open to PostgREST per worker
+DEFAULT_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '20'))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv('SUPABASE_TIMEOUT_SECONDS', '10'))
+
+# Buckets fetched per chart point, leaving LTTB room to pick the peaks and dips
+HISTORY_BUCKETS_PER_POINT = 4
+MIN_HISTORY_BUCKET_SECONDS = 60
+# date_bin origin used by get_price_history_buckets (2000-01-01 UTC)
+HISTORY_BUCKET_ORIGIN = datetime(2000, 1, 1, tzinfo=timezone.utc).timestamp()
+
+# Promotions have no insert path in this process, so cap how long a result may live
+PROMOTIONS_CACHE_TTL_SECONDS = int(os.getenv('PROMOTIONS_CACHE_TTL_SECONDS', '3600'))
+
+# dashboard_stats runs several COUNT(*) subqueries, so share one result per minute
+DASHBOARD_STATS_CACHE_TTL_SECONDS = int(os.getenv('DASHBOARD_STATS_CACHE_TTL_SECONDS', '60'))
+
+# Rows held in memory at a time while streaming an export
+EXPORT_CHUNK_SIZE = 1000
+# Products whose prices are fetched together by the catalog export (ids go in the URL)
+EXPORT_PRODUCT_BATCH_SIZE = 200
+
+# Largest /api/products page; the export endpoint is the way to read the whole catalogue
+MAX_PRODUCTS_PAGE_SIZE = 100
+
+
+def _pg_literal(value) -> str:
+    """Quote a value for use inside a PostgREST logic filter"""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class AsyncDatabaseManager:
+    """Non-blocking implementation of the DatabaseManager read API"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.supabase_url = os.getenv('SUPABASE_URL')
+        self.supabase_key = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_ANON_KEY')
+        self.client = httpx.AsyncClient(
+            base_url=f"{self.supabase_url}/rest/v1",
+            headers={
+                'apikey': self.supabase_key,
+                'Authorization': f"Bearer {self.supabase_key}",
+            },
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size
+            ),
+            timeout=timeout
+        )
+        self.price_cache = latest_prices_snapshot
+        self.snapshot_path = PRICE_SNAPSHOT_PATH
+        self._snapshot_file_id = None
+        self.promotions_cache = QueryCache()
+        self.stats_cache = QueryCache(max_entries=1)
+        # Called with the method name when a method handles a database error itself
+        self.error_hook: Optional[Callable[[str], None]] = None
+
+    async def close(self):
+        """Release pooled connections"""
+        await self.client.aclose()
+
+    def _report_error(self, method: str):
+        """Count an error that method caught and answered with an empty result"""
+        if self.error_hook is not None:
+            self.error_hook(method)
+
+    async def ping(self):
+        """Cheapest possible round-trip, used by the readiness heartbeat"""
+        await self._select('retailers', {'select': 'id', 'limit': 1})
+
+    async def _select(self, table: str, params) -> List[Dict]:
+        """GET rows from a table or view using PostgREST query params"""
+        response = await self.client.get(f"/{table}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _rpc(self, function: str, args: Optional[Dict] = None):
+        """Call a Postgres function exposed through PostgREST"""
+        response = await self.client.post(f"/rpc/{function}", json=args or {})
+        response.raise_for_status()
+        return response.json()
+
+    async def _iter_keyset(
+        self,
+        table: str,
+        params: List[Tuple[str, str]],
+        key_columns: Sequence[str],
+        chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[List[Dict]]:
+        """Yield a table in chunks, seeking past the last key instead of using offsets
+
+        PostgREST has no server-side cursors; keyset pages give the same
+        constant memory and constant per-page cost. key_columns is one
+        unique column or a pair.
+        """
+        first, second = (list(key_columns) + [None])[:2]
+        last_row = None
+
+        while True:
+            page_params = list(params) + [
+                ('order', f"{first},{second}" if second else first),
+                ('limit', str(chunk_size))
+            ]
+            if last_row is not None and second is None:
+                page_params.append((first, f"gt.{last_row[first]}"))
+            elif last_row is not None:
+                a, b = _pg_literal(last_row[first]), _pg_literal(last_row[second])
+                page_params.append(('or', f"({first}.gt.{a},and({first}.eq.{a},{second}.gt.{b}))"))
+
+            rows = await self._select(table, page_params)
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            last_row = rows[-1]
+
+    async def export_products(
+        self,
+        retailer: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> AsyncIterator[Dict]:
+        """Stream the catalog: every product's latest price at every retailer
+
+        Pages are keyed on products.id, and each page's prices come from
+        latest_prices filtered to just those product ids, so no request
+        makes the database evaluate the view for the whole catalogue.
+        """
+        filters = []
+        if retailer:
+            filters.append(('retailer', f"eq.{retailer}"))
+        if start:
+            filters.append(('last_updated', f"gte.{start.isoformat()}"))
+        if end:
+            filters.append(('last_updated', f"lt.{end.isoformat()}"))
+
+        products = self._iter_keyset('products', [('select', 'id')], ('id',), EXPORT_PRODUCT_BATCH_SIZE)
+        async for batch in products:
+            ids = ','.join(str(product['id']) for product in batch)
+            params = [('select', '*'), ('product_id', f"in.({ids})")] + filters
+            async for rows in self._iter_keyset('latest_prices', params, ('product_id', 'retailer_id')):
+                for row in rows:
+                    yield format_latest_price(row)
+
+    async def export_prices(
+        self,
+        retailer: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> AsyncIterator[Dict]:
+        """Stream raw price observations, oldest first"""
+        links = 'retailer_links!inner(product_id,products(slug),retailers!inner(name))'
+        params = [(
+            'select',
+            f"time,link_id,price_cash,price_credit,original_price,currency,in_stock,stock_status,promo_text,{links}"
+        )]
+        if retailer:
+            params.append(('retailer_links.retailers.name', f"eq.{retailer}"))
+        if start:
+            params.append(('time', f"gte.{start.isoformat()}"))
+        if end:
+            params.append(('time', f"lt.{end.isoformat()}"))
+
+        async for rows in self._iter_keyset('prices', params, ('time', 'link_id')):
+            for row in rows:
+                link = row.pop('retailer_links') or {}
+                row['product_id'] = link.get('product_id')
+                row['product_slug'] = (link.get('products') or {}).get('slug')
+                row['retailer'] = (link.get('retailers') or {}).get('name')
+                yield row
+
+    async def get_latest_prices(self, limit: int = 100) -> List[Dict]:
+        """Get latest prices for all products (served from the shared snapshot)"""
+
+        try:
+            self._check_snapshot_file()
+            rows = await self.price_cache.get_rows_async(self._load_latest_prices)
+            return rows[:limit]
+        except Exception as e:
+            self._report_error('get_latest_prices')
+            print(f"Error getting latest prices: {e}")
+            return []
+
+    async def search_latest_prices(self, model_query: str) -> List[Dict]:
+        """Get latest prices whose product name or model contains model_query"""
+
+        try:
+            self._check_snapshot_file()
+            return await self.price_cache.search_async(self._load_latest_prices, model_query)
+        except Exception as e:
+            self._report_error('search_latest_prices')
+            print(f"Error searching latest prices: {e}")
+            return []
+
+    async def refresh_latest_prices(self):
+        """Bring the snapshot up to date on its own schedule, publishing changes to its listeners
+
+        Never forces a reload: a new snapshot file is picked up with one stat(),
+        and the database is only read once the snapshot's TTL has run out, as
+        any read endpoint would do anyway.
+        """
+        self._check_snapshot_file()
+        await self.price_cache.get_rows_async(self._load_latest_prices)
+
+    def _check_snapshot_file(self) -> bool:
+        """Invalidate the snapshot when the scraper has replaced the snapshot file
+
+        Returns True when a snapshot file exists. One stat() per call:
+        os.replace gives every new snapshot a new inode.
+        """
+        if not self.snapshot_path:
+            return False
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return False
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        if file_id != self._snapshot_file_id:
+            self._snapshot_file_id = file_id
+            self.price_cache.invalidate()
+        return True
+
+    async def _load_latest_prices(self) -> List[Dict]:
+        """Read the whole latest_prices view for the snapshot
+
+        Maps the scraper's snapshot file instead when there is one younger than
+        PRICE_SNAPSHOT_MAX_AGE_SECONDS, so a scraper that stopped publishing
+        can't pin the API to old prices.
+        """
+        if self.snapshot_path:
+            mapped = open_snapshot(self.snapshot_path)
+            if mapped is not None:
+                return mapped
+
+        rows = []
+        offset = 0
+
+        while True:
+            page = await self._select('latest_prices', {
+                'select': '*',
+                'order': 'last_updated.desc,product_id,retailer_id',
+                'offset': offset,
+                'limit': SNAPSHOT_PAGE_SIZE
+            })
+            rows.extend(format_latest_price(row) for row in page)
+
+            if len(page) < SNAPSHOT_PAGE_SIZE:
+                return rows
+            offset += SNAPSHOT_PAGE_SIZE
+
+    async def list_products(
+        self,
+        limit: int = 100,
+        cursor: Optional[int] = None,
+        brand: Optional[str] = None,
+        retailer: Optional[str] = None,
+        in_stock: Optional[bool] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Dict:
+        """Page through products with their best matching retailer price
+
+        Filters run inside the query and pages are keyed on product_id, so
+        page N costs the same as page 1. Pass the returned next_cursor back
+        as cursor to fetch the following page.
+        """
+        limit = min(max(limit, 1), MAX_PRODUCTS_PAGE_SIZE)
+        filters: List[Tuple[str, str]] = []
+        if brand:
+            filters.append(('brand', f"ilike.{brand}"))
+        if retailer:
+            filters.append(('retailer', f"eq.{retailer}"))
+        if in_stock is not None:
+            filters.append(('in_stock', f"is.{str(in_stock).lower()}"))
+        if min_price is not None:
+            filters.append(('price', f"gte.{min_price}"))
+        if max_price is not None:
+            filters.append(('price', f"lte.{max_price}"))
+
+        # latest_prices has one row per retailer, so read a few rows per product
+        chunk_size = max(limit * 4, 50)
+        products: Dict[int, Dict] = {}
+        last_key = None
+
+        try:
+            while True:
+                params = [('select', '*'), ('order', 'product_id,retailer_id'), ('limit', str(chunk_size))]
+                params += filters
+                if last_key:
+                    product_id, retailer_id = last_key
+                    params.append(('or', f"(product_id.gt.{product_id},and(product_id.eq.{product_id},retailer_id.gt.{retailer_id}))"))
+                elif cursor is not None:
+                    params.append(('product_id', f"gt.{cursor}"))
+
+                rows = await self._select('latest_prices', params)
+
+                for row in rows:
+                    product = products.get(row['product_id'])
+                    if product is None:
+                        product = products[row['product_id']] = {
+                            'id': row['product_id'],
+                            'name': row['product_name'],
+                            'brand': row['brand'],
+                            'model': row['model'],
+                            'slug': row['slug'],
+                            'best_price': None,
+                            'retailer': None,
+                            'in_stock': row['in_stock'],
+                            'url': row.get('url')
+                        }
+                    price = row.get('price') or None
+                    if price is not None and (product['best_price'] is None or price < product['best_price']):
+                        product.update({
+                            'best_price': price,
+                            'retailer': row['retailer'],
+                            'in_stock': row['in_stock'],
+                            'url': row.get('url')
+                        })
+                    elif product['retailer'] is None:
+                        product['retailer'] = row['retailer']
+
+                # One product past the page tells us the last one is complete
+                if len(products) > limit:
+                    page = list(products.values())[:limit]
+                    return {'products': page, 'next_cursor': page[-1]['id']}
+                if len(rows) < chunk_size:
+                    return {'products': list(products.values()), 'next_cursor': None}
+
+                last_key = (rows[-1]['product_id'], rows[-1]['retailer_id'])
+        except Exception as e:
+            self._report_error('list_products')
+            print(f"Error listing products: {e}")
+            return {'products': [], 'next_cursor': None}
+
+    async def get_dashboard_stats(self) -> Dict:
+        """Get statistics for dashboard (cached for DASHBOARD_STATS_CACHE_TTL_SECONDS)"""
+
+        cached = self.stats_cache.get('dashboard')
+        if cached is not None:
+            return cached
+
+        try:
+            rows = await self._select('dashboard_stats', {'select': '*'})
+
+            if rows:
+                stats = format_dashboard_stats(rows[0])
+                self.stats_cache.set('dashboard', stats, time.time() + DASHBOARD_STATS_CACHE_TTL_SECONDS)
+                return stats
+            return {}
+        except Exception as e:
+            self._report_error('get_dashboard_stats')
+            print(f"Error getting dashboard stats: {e}")
+            return {}
+
+    def get_cached_dashboard_stats(self) -> Optional[Dict]:
+        """Dashboard stats if already cached, without touching the database"""
+        return self.stats_cache.get('dashboard')
+
+    async def get_product_by_slug(self, slug: str) -> Optional[Dict]:
+        """Get product details with all retailer prices"""
+
+        products = await self.get_products_by_slugs([slug])
+        return products[0] if products else None
+
+    async def get_products_by_slugs(self, slugs: List[str]) -> List[Dict]:
+        """Get several products with their retailer prices in two queries
+
+        Results follow the order of slugs; unknown slugs are left out.
+        """
+        if not slugs:
+            return []
+
+        try:
+            quoted = ','.join(_pg_literal(slug) for slug in slugs)
+            products = await self._select('products', {
+                'select': 'id,name,brand,model,variant,slug',
+                'slug': f"in.({quoted})"
+            })
+
+            if not products:
+                return []
+
+            # Get all current prices from different retailers, for every product at once
+            product_ids = ','.join(str(product['id']) for product in products)
+            price_rows = await self._select('latest_prices', {
+                'select': '*',
+                'product_id': f"in.({product_ids})",
+                'order': 'price.asc.nullslast'
+            })
+
+            prices_by_product: Dict[int, List[Dict]] = {}
+            for row in price_rows:
+                prices_by_product.setdefault(row['product_id'], []).append(row)
+
+            by_slug = {
+                product['slug']: format_product(product, prices_by_product.get(product['id'], []))
+                for product in products
+            }
+            return [by_slug[slug] for slug in slugs if slug in by_slug]
+        except Exception as e:
+            self._report_error('get_products_by_slugs')
+            print(f"Error getting products by slug: {e}")
+            return []
+
+    async def get_price_history(
+        self,
+        slug: str,
+        days: int = 30,
+        retailer: Optional[str] = None,
+        max_points: int = 300
+    ) -> Dict:
+        """Get downsampled per-retailer price history plus summary statistics
+
+        The database groups price rows into time buckets, starting from the
+        price each retailer held when the window opened. Prices are only
+        stored when they change, so each retailer's last price is carried
+        forward to now and the average is weighted by how long each price
+        held. Each series is then cut to max_points with LTTB.
+        """
+        max_points = max(max_points, 3)
+        bucket_seconds = max(
+            math.ceil(days * 86400 / (max_points * HISTORY_BUCKETS_PER_POINT)),
+            MIN_HISTORY_BUCKET_SECONDS
+        )
+
+        try:
+            buckets = await self._rpc('get_price_history_buckets', {
+                'p_slug': slug,
+                'p_days': days,
+                'p_bucket_seconds': bucket_seconds,
+                'p_retailer': retailer
+            })
+
+            series: Dict[str, List[Dict]] = {}
+            last_rows: Dict[str, Dict] = {}
+            lowest = highest = None
+            changes = 0
+
+            # Rows arrive ordered by retailer, then bucket
+            for row in buckets:
+                min_price = float(row['min_price'])
+                max_price = float(row['max_price'])
+                lowest = min_price if lowest is None else min(lowest, min_price)
+                highest = max_price if highest is None else max(highest, max_price)
+                changes += row['changes']
+                last_rows[row['retailer']] = row
+
+                series.setdefault(row['retailer'], []).append({
+                    'timestamp': row['bucket'],
+                    'retailer': row['retailer'],
+                    'price': float(row['avg_price']),
+                    'min_price': min_price,
+                    'max_price': max_price,
+                    'in_stock': row['in_stock'],
+                    '_x': datetime.fromisoformat(row['bucket']).timestamp()
+                })
+
+            now = time.time()
+            current_bucket = HISTORY_BUCKET_ORIGIN + (now - HISTORY_BUCKET_ORIGIN) // bucket_seconds * bucket_seconds
+            weighted_total = 0.0
+            weighted_seconds = 0.0
+            for name, points in series.items():
+                # Each bucket's price held until the next one, the last until now
+                for point, next_x in zip(points, [p['_x'] for p in points[1:]] + [now]):
+                    held = max(next_x - point['_x'], 1.0)
+                    weighted_total += point['price'] * held
+                    weighted_seconds += held
+
+                last_row = last_rows[name]
+                if points[-1]['_x'] < current_bucket:
+                    last_price = float(last_row['last_price'])
+                    points.append({
+                        'timestamp': datetime.fromtimestamp(current_bucket, timezone.utc).isoformat(),
+                        'retailer': name,
+                        'price': last_price,
+                        'min_price': last_price,
+                        'max_price': last_price,
+                        'in_stock': last_row['in_stock'],
+                        '_x': current_bucket
+                    })
+
+            history = []
+            for points in series.values():
+                history.extend(lttb(points, max_points, x=lambda p: p['_x'], y=lambda p: p['price']))
+            for point in history:
+                point.pop('_x', None)
+
+            statistics = None
+            if series:
+                current_price = min(float(row['last_price']) for row in last_rows.values())
+                statistics = {
+                    'lowest_price': lowest,
+                    'highest_price': highest,
+                    'average_price': round(weighted_total / weighted_seconds, 2),
+                    'current_price': current_price,
+                    'current_vs_lowest_pct': round((current_price - lowest) / lowest * 100, 2) if lowest else None,
+                    'price_changes': changes
+                }
+
+            return {
+                'bucket_seconds': bucket_seconds,
+                'history': history,
+                'statistics': statistics
+            }
+        except Exception as e:
+            self._report_error('get_price_history')
+            print(f"Error getting price history: {e}")
+            return {'bucket_seconds': bucket_seconds, 'history': [], 'statistics': None}
+
+    async def get_retailer_comparison(self) -> Dict:
+        """Compare retailers using the precomputed retailer_price_stats table"""
+        try:
+            rows = await self._select('retailer_price_stats', {
+                'select': 'retailer,product_count,avg_price,min_price,max_price,in_stock_count,refreshed_at',
+                'order': 'avg_price.desc.nullslast'
+            })
+            return {'retailers': rows}
+        except Exception as e:
+            self._report_error('get_retailer_comparison')
+            print(f"Error getting retailer comparison: {e}")
+            return {'retailers': []}
+
+    async def get_active_promotions(self, brand: Optional[str] = None, retailer: Optional[str] = None) -> Dict:
+        """Get active promotions with their product and retailer
+
+        Filters match idx_promotions_active (is_active, end_date). Results
+        are cached until the earliest end_date among them lapses, or until
+        invalidate_promotions() is called after an insert.
+        """
+        cache_key = ((brand or '').lower(), retailer or '')
+        cached = self.promotions_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        today = datetime.now(timezone.utc).date()
+        params = [
+            ('select', ','.join([
+                'id', 'promo_type', 'description', 'discount_amount', 'discount_percentage',
+                'start_date', 'end_date', 'source', 'source_url', 'created_at',
+                # Inner joins only when filtering on the embedded table
+                f"products{'!inner' if brand else ''}(id,name,brand,model,slug)",
+                f"retailers{'!inner' if retailer else ''}(name)"
+            ])),
+            ('is_active', 'is.true'),
+            ('or', f"(end_date.is.null,end_date.gte.{today.isoformat()})"),
+            ('order', 'end_date.asc.nullslast,id')
+        ]
+        if brand:
+            params.append(('products.brand', f"ilike.{brand}"))
+        if retailer:
+            params.append(('retailers.name', f"eq.{retailer}"))
+
+        try:
+            rows = await self._select('promotions', params)
+        except Exception as e:
+            self._report_error('get_active_promotions')
+            print(f"Error getting active promotions: {e}")
+            return {'count': 0, 'total_count': 0, 'promotions': []}
+
+        # Promotions carry no prices of their own: show the listing's current one
+        prices = await self._promotion_prices(rows)
+
+        promotions = []
+        for row in rows:
+            product = row.get('products') or {}
+            retailer_name = (row.get('retailers') or {}).get('name')
+            price = prices.get((product.get('id'), retailer_name)) or {}
+            promotions.append({
+                'id': row['id'],
+                'product_name': product.get('name'),
+                'brand': product.get('brand'),
+                'model': product.get('model'),
+                'slug': product.get('slug'),
+                'retailer': retailer_name,
+                'title': (row.get('promo_type') or 'promotion').replace('_', ' ').title(),
+                'original_price': price.get('original_price'),
+                'discounted_price': price.get('price_cash'),
+                'promo_type': row.get('promo_type'),
+                'description': row.get('description'),
+                'discount_amount': row.get('discount_amount'),
+                'discount_percentage': row.get('discount_percentage'),
+                'valid_from': row.get('start_date'),
+                'valid_until': row.get('end_date'),
+                'source': row.get('source'),
+                'source_url': row.get('source_url'),
+                'created_at': row.get('created_at')
+            })
+        result = {'count': len(promotions), 'total_count': len(promotions), 'promotions': promotions}
+
+        # The set only shrinks when the earliest end_date has passed (CURRENT_DATE is UTC on Supabase)
+        expires_at = time.time() + PROMOTIONS_CACHE_TTL_SECONDS
+        end_dates = [date.fromisoformat(row['end_date']) for row in rows if row.get('end_date')]
+        if end_dates:
+            boundary = datetime.combine(min(end_dates) + timedelta(days=1), dt_time.min, tzinfo=timezone.utc)
+            expires_at = min(expires_at, boundary.timestamp())
+        self.promotions_cache.set(cache_key, result, expires_at)
+
+        return result
+
+    async def _promotion_prices(self, rows: List[Dict]) -> Dict[Tuple, Dict]:
+        """Latest price per (product_id, retailer) for the promoted products, from the snapshot"""
+        product_ids = {(row.get('products') or {}).get('id') for row in rows}
+        if not product_ids:
+            return {}
+        try:
+            self._check_snapshot_file()
+            snapshot = await self.price_cache.get_rows_async(self._load_latest_prices)
+        except Exception as e:
+            # Promotions are still worth listing without prices
+            print(f"Error getting promotion prices: {e}")
+            return {}
+        return {
+            (price['product_id'], price['retailer_name']): price
+            for price in snapshot
+            if price['product_id'] in product_ids
+        }
+
+    def invalidate_promotions(self):
+        """Drop cached promotions (call after inserting or deactivating one)"""
+        self.promotions_cache.invalidate()
+
+    async def get_scraper_logs(self, limit: int = 20) -> Dict:
+        """Get recent scraper execution logs"""
+        try:
+            rows = await self._select('scraper_logs', {
+                'select': '*',
+                'order': 'created_at.desc',
+                'limit': limit
+            })
+            logs = [format_scraper_log(row) for row in rows]
+
+            return {
+                'total_count': len(logs),
+                'logs': logs
+            }
+        except Exception as e:
+            self._report_error('get_scraper_logs')
+            print(f"Error getting scraper logs: {e}")
+            return {'total_count': 0, 'logs': []}
+
+    async def get_brand_comparison(self) -> Dict:
+        """Compare average prices across brands"""
+        try:
+            result = await self._rpc('get_brand_comparison')
+
+            if result:
+                return {'brands': result}
+
+            # Fallback: aggregate manually from latest_prices
+            rows = await self._select('latest_prices', {'select': '*'})
+            return {'brands': aggregate_brand_comparison(rows)}
+
+        except Exception as e:
+            self._report_error('get_brand_comparison')
+            print(f"Error getting brand comparison: {e}")
+            return {'brands': []}
@@ -1,11 +1,166 @@
 from supabase import create_client, Client
-from typing import Dict, List, Optional
-from datetime import datetime
+from postgrest.types import ReturnMethod
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timezone
 import os
+import time
 from dotenv import load_dotenv
 
+from database.identity_map import ingest_identity_map
+from database.price_cache import latest_prices_snapshot
+from database.snapshot_file import PRICE_SNAPSHOT_PATH, write_snapshot
+
 load_dotenv()
 
+# PostgREST caps a single response, so the snapshot is loaded in pages
+SNAPSHOT_PAGE_SIZE = 1000
+
+# Rows per bulk insert/upsert request, keeping request bodies a reasonable size
+BULK_WRITE_CHUNK_SIZE = 500
+
+
+# Observation columns compared to decide whether a price row is worth writing
+# (same names in prices and current_prices)
+PRICE_STATE_COLUMNS = [
+    'price_cash', 'price_credit', 'original_price', 'in_stock', 'stock_status', 'promo_text'
+]
+
+
+def _same_value(a, b) -> bool:
+    """Compare stored and scraped values, treating 12999, 12999.0 and '12999' alike"""
+    if a is None or b is None or isinstance(a, bool) or isinstance(b, bool):
+        return a == b
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return a == b
+
+
+def price_changed(price_row: Dict, last: Optional[Dict]) -> bool:
+    """True when a new observation differs from the link's latest stored one"""
+    if last is None:
+        return True
+    return any(
+        not _same_value(price_row.get(column), last.get(column))
+        for column in PRICE_STATE_COLUMNS
+        if column in price_row
+    )
+
+
+def scraped_product_slug(name: str) -> str:
+    """URL slug for a scraped product name"""
+    slug = name.lower().replace(' ', '-').replace('/', '-')
+    return ''.join(c for c in slug if c.isalnum() or c == '-')
+
+
+def format_latest_price(row: Dict) -> Dict:
+    """Map a latest_prices view row to the API shape"""
+    return {
+        'product_id': row['product_id'],
+        'product_name': row['product_name'],
+        'brand': row['brand'],
+        'model': row['model'],
+        'slug': row['slug'],
+        'retailer_name': row['retailer'],  # View column is 'retailer'
+        'price_cash': row.get('price') or None,  # View column is 'price'; 0 means no price, as before
+        'original_price': row.get('original_price') or None,
+        'in_stock': row['in_stock'],
+        'stock_status': row['stock_status'],
+        'promo_text': row.get('promo_text'),
+        'url': row.get('url'),  # View column is 'url'
+        'last_updated': row['last_updated']
+    }
+
+
+def format_retailer_price(row: Dict) -> Dict:
+    """Map a latest_prices view row to a product's per-retailer price"""
+    return {
+        'retailer': row['retailer'],  # View column is 'retailer'
+        'price': row.get('price') or None,  # View column is 'price'; 0 means no price, as before
+        'original_price': row.get('original_price') or None,
+        'in_stock': row['in_stock'],
+        'stock_status': row['stock_status'],
+        'promo_text': row.get('promo_text'),
+        'url': row.get('url'),  # View column is 'url'
+        'last_updated': row['last_updated']
+    }
+
+
+def format_product(product: Dict, price_rows: List[Dict]) -> Dict:
+    """Combine a products row with its latest_prices rows"""
+    return {
+        'id': product['id'],
+        'name': product['name'],
+        'brand': product['brand'],
+        'model': product['model'],
+        'variant': product.get('variant'),
+        'slug': product['slug'],
+        'prices': [format_retailer_price(row) for row in price_rows]
+    }
+
+
+def format_scraper_log(row: Dict) -> Dict:
+    """Map a scraper_logs row to the API shape"""
+    return {
+        'id': row['id'],
+        'retailer': row['retailer'],
+        'status': row['status'],
+        'products_found': row.get('products_found', 0),
+        'products_saved': row.get('products_saved', 0),
+        'errors': row.get('errors'),
+        'execution_time_ms': row.get('execution_time_ms'),
+        'created_at': row['created_at']
+    }
+
+
+def format_dashboard_stats(row: Dict) -> Dict:
+    """Map the dashboard_stats view row to the API shape"""
+    return {
+        'total_products': row['total_products'],
+        'active_retailers': row['active_retailers'],
+        'products_in_stock': row['products_in_stock'],
+        'active_promotions': row['active_promotions'],
+        'last_scrape_time': row.get('last_scrape_time')
+    }
+
+
+def aggregate_brand_comparison(rows: List[Dict]) -> List[Dict]:
+    """Per-brand price aggregates from latest_prices rows"""
+    brands_data = {}
+
+    for row in rows:
+        brand = row['brand']
+        if brand not in brands_data:
+            brands_data[brand] = {
+                'brand': brand,
+                'products': set(),
+                'prices': [],
+                'in_stock_count': 0
+            }
+
+        brands_data[brand]['products'].add(row['product_id'])
+        if row.get('price'):  # View column is 'price'
+            brands_data[brand]['prices'].append(float(row['price']))
+        if row.get('in_stock'):
+            brands_data[brand]['in_stock_count'] += 1
+
+    # Calculate aggregates
+    brands = []
+    for brand, data in brands_data.items():
+        if data['prices']:
+            brands.append({
+                'brand': brand,
+                'product_count': len(data['products']),
+                'avg_price': sum(data['prices']) / len(data['prices']),
+                'min_price': min(data['prices']),
+                'max_price': max(data['prices']),
+                'in_stock_count': data['in_stock_count']
+            })
+
+    brands.sort(key=lambda x: x['avg_price'], reverse=True)
+    return brands
+
+
 class DatabaseManager:
     """Handle all database operations using Supabase Python client"""
 
@@ -13,21 +168,25 @@ class DatabaseManager:
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_ANON_KEY')
         self.client: Client = create_client(self.supabase_url, self.supabase_key)
+        self.price_cache = latest_prices_snapshot
+        self.identity_map = ingest_identity_map
 
     def save_scrape_result(self, retailer_name: str, result: Dict, normalized_products: List[Dict]):
         """Save complete scraping results to database"""
 
         try:
-            # Get retailer ID
-            retailer_response = self.client.table('retailers').select('id').eq('name', retailer_name).execute()
-
-            if not retailer_response.data:
+            # Get retailer ID (from the identity map, preloaded once per process;
+            # a retailer added since then is looked up once)
+            self.identity_map.ensure_loaded(self.client)
+            if retailer_name not in self.identity_map.retailers:
+                self._find_retailers([retailer_name])
+            retailer_id = self.identity_map.retailers.get(retailer_name)
+
+            if retailer_id is None:
                 raise Exception(f"Retailer {retailer_name} not found in database")
 
-            retailer_id = retailer_response.data[0]['id']
-
             # Log the scrape attempt
-            self.client.table('scraper_logs').insert({
+            log = self.client.table('scraper_logs').insert({
                 'retailer': retailer_name,
                 'status': result['status'],
                 'products_found': result['products_found'],
@@ -41,126 +200,203 @@ class DatabaseManager:
                 'last_scraped_at': datetime.now().isoformat()
             }).eq('id', retailer_id).execute()
 
-            # Process each product
-            products_updated = 0
-            for raw_product, normalized in zip(result['products'], normalized_products):
-                if 'error' not in normalized:
-                    self._save_product_price(retailer_id, raw_product, normalized)
-                    products_updated += 1
-
-            # Update scraper log with products_saved count
-            # Get the most recent log for this retailer
-            recent_log = self.client.table('scraper_logs')\
-                .select('id')\
-                .eq('retailer', retailer_name)\
-                .order('created_at', desc=True)\
-                .limit(1)\
-                .execute()
+            # Save every product in a few bulk requests
+            entries = [
+                self._scrape_entry(retailer_id, raw_product, normalized)
+                for raw_product, normalized in zip(result['products'], normalized_products)
+                if 'error' not in normalized
+            ]
+            products_updated, prices_changed = self._bulk_save(entries) if entries else (0, 0)
 
-            if recent_log.data:
+            # Update scraper log with products_saved count (the insert returned its id)
+            if log.data:
                 self.client.table('scraper_logs').update({
                     'products_saved': products_updated
-                }).eq('id', recent_log.data[0]['id']).execute()
+                }).eq('id', log.data[0]['id']).execute()
 
-            print(f"Successfully saved {products_updated} products from {retailer_name}")
+            if prices_changed:
+                self.refresh_retailer_stats(retailer_name)
+            # Every save: the snapshot file is how API workers learn about new prices,
+            # they ignore one older than its max age, and last_seen_at moved even when
+            # no price did
+            self.publish_price_snapshot()
+
+            print(f"Successfully saved {products_updated} products from {retailer_name} ({prices_changed} price changes)")
 
         except Exception as e:
+            self.identity_map.clear()
             print(f"Database error: {e}")
             raise e
 
-    def _save_product_price(self, retailer_id: int, raw_product: Dict, normalized: Dict):
-        """Save or update a product and its price"""
-
-        slug = normalized['slug']
-
-        # Find or create product
-        product_response = self.client.table('products').select('id').eq('slug', slug).execute()
-
-        if not product_response.data:
-            # Create new product
-            new_product = self.client.table('products').insert({
+    @staticmethod
+    def _scrape_entry(retailer_id: int, raw_product: Dict, normalized: Dict) -> Dict:
+        """Bulk save entry for one product of a save_scrape_result batch"""
+        link = {'scraped_name': raw_product['name']}
+        if raw_product.get('url'):
+            # Leave the stored URL alone when this listing came without one
+            link['original_url'] = raw_product['url']
+
+        return {
+            'retailer_id': retailer_id,
+            'product': {
                 'name': normalized['normalized_name'],
                 'brand': normalized['brand'],
                 'model': normalized['model'],
                 'variant': normalized.get('variant', ''),
-                'slug': slug
-            }).execute()
-            product_id = new_product.data[0]['id']
-        else:
-            product_id = product_response.data[0]['id']
-            # Update product info
-            self.client.table('products').update({
-                'updated_at': datetime.now().isoformat(),
-                'variant': normalized.get('variant', '')
-            }).eq('id', product_id).execute()
-
-        # Find or create retailer link
-        link_response = self.client.table('retailer_links')\
-            .select('id')\
-            .eq('product_id', product_id)\
-            .eq('retailer_id', retailer_id)\
-            .execute()
+                'slug': normalized['slug']
+            },
+            'link': link,
+            'price': {
+                'price_cash': raw_product.get('price_cash'),
+                'price_credit': raw_product.get('price_credit'),
+                'original_price': raw_product.get('original_price'),
+                'in_stock': raw_product.get('in_stock', True),
+                'stock_status': raw_product.get('stock_status', 'in_stock'),
+                'promo_text': raw_product.get('promo_text')
+            }
+        }
+
+    def _bulk_save(self, entries: List[Dict]) -> Tuple[int, int]:
+        """Upsert products and retailer links, then insert a price for each link whose price changed
+
+        Each entry holds a 'retailer_id' and the 'product', 'link' and 'price'
+        columns to write. Takes a few bulk requests per chunk instead of several
+        requests per product. Unchanged links only get last_seen_at bumped by the
+        link upsert. Returns the number of links saved (one per product per
+        retailer, after duplicates collapse) and the number of prices written.
+        """
+        # Timezone-aware: last_seen_at now feeds latest_prices.last_updated
+        now = datetime.now(timezone.utc).isoformat()
+
+        # One price per link per save: a later listing of the same product at the same retailer wins
+        entries = list({(e['product']['slug'], e['retailer_id']): e for e in entries}.values())
+
+        # ON CONFLICT can't touch a row twice in one statement, so one row per slug
+        product_rows = {e['product']['slug']: {**e['product'], 'updated_at': now} for e in entries}
+        products = self._bulk_write('products', list(product_rows.values()), on_conflict='slug')
+        product_ids = {row['slug']: row['id'] for row in products}
+
+        links = self._bulk_write('retailer_links', [
+            {
+                'product_id': product_ids[e['product']['slug']],
+                'retailer_id': e['retailer_id'],
+                'last_seen_at': now,
+                **e['link']
+            }
+            for e in entries
+        ], on_conflict='product_id,retailer_id')
+        link_ids = {(row['product_id'], row['retailer_id']): row['id'] for row in links}
+
+        # Prices are time-series rows: a new row only when the observation changed.
+        # Links the identity map didn't know yet are new, so they have no last price to read
+        keys = [(product_ids[e['product']['slug']], e['retailer_id']) for e in entries]
+        last_prices = self._last_prices([
+            self.identity_map.links[key] for key in keys if key in self.identity_map.links
+        ])
+        self.identity_map.add_links(links)
+        price_rows = [
+            {'link_id': link_ids[key], **e['price']}
+            for key, e in zip(keys, entries)
+            if price_changed(e['price'], last_prices.get(link_ids[key]))
+        ]
+        self._bulk_write('prices', price_rows)
+        return len(entries), len(price_rows)
+
+    def _last_prices(self, link_ids: List[int]) -> Dict[int, Dict]:
+        """Latest stored observation per link from current_prices, one read per chunk"""
+        columns = ','.join(['link_id'] + PRICE_STATE_COLUMNS)
+        last = {}
+
+        for start in range(0, len(link_ids), BULK_WRITE_CHUNK_SIZE):
+            result = self.client.table('current_prices')\
+                .select(columns)\
+                .in_('link_id', link_ids[start:start + BULK_WRITE_CHUNK_SIZE])\
+                .execute()
+            for row in result.data:
+                last[row['link_id']] = row
+
+        return last
+
+    def _bulk_write(self, table: str, rows: List[Dict], on_conflict: Optional[str] = None) -> List[Dict]:
+        """Insert (or upsert on on_conflict) rows in chunked bulk requests
+
+        PostgREST needs every object in one request to have the same keys, so
+        rows are grouped by their columns first. Returns the written rows for
+        upserts; plain inserts skip sending rows back.
+        """
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        written = []
+        for group in groups.values():
+            for start in range(0, len(group), BULK_WRITE_CHUNK_SIZE):
+                chunk = group[start:start + BULK_WRITE_CHUNK_SIZE]
+                if on_conflict:
+                    result = self.client.table(table).upsert(chunk, on_conflict=on_conflict).execute()
+                    written.extend(result.data)
+                else:
+                    self.client.table(table).insert(chunk, returning=ReturnMethod.minimal).execute()
+        return written
+
+    def refresh_retailer_stats(self, retailer_name: str):
+        """Recompute the retailer comparison aggregates after a scrape commits"""
+        try:
+            self.client.rpc('refresh_retailer_price_stats', {'p_retailer_name': retailer_name}).execute()
+        except Exception as e:
+            # Stale comparison numbers are not worth failing a save over
+            print(f"Error refreshing retailer stats for {retailer_name}: {e}")
 
-        if not link_response.data:
-            new_link = self.client.table('retailer_links').insert({
-                'product_id': product_id,
-                'retailer_id': retailer_id,
-                'original_url': raw_product.get('url'),
-                'scraped_name': raw_product['name']
-            }).execute()
-            link_id = new_link.data[0]['id']
-        else:
-            link_id = link_response.data[0]['id']
-            # Update last_seen and scraped name
-            self.client.table('retailer_links').update({
-                'last_seen_at': datetime.now().isoformat(),
-                'scraped_name': raw_product['name'],
-                'original_url': raw_product.get('url') or link_response.data[0].get('original_url')
-            }).eq('id', link_id).execute()
-
-        # Insert price record (time-series data)
-        self.client.table('prices').insert({
-            'link_id': link_id,
-            'price_cash': raw_product.get('price_cash'),
-            'price_credit': raw_product.get('price_credit'),
-            'original_price': raw_product.get('original_price'),
-            'in_stock': raw_product.get('in_stock', True),
-            'stock_status': raw_product.get('stock_status', 'in_stock'),
-            'promo_text': raw_product.get('promo_text')
-        }).execute()
+    def publish_price_snapshot(self):
+        """Write the latest prices to the shared snapshot file the API workers map"""
+        if not PRICE_SNAPSHOT_PATH:
+            return
+        try:
+            # One read of latest_prices per scrape, however many workers serve it
+            version = write_snapshot(PRICE_SNAPSHOT_PATH, self._load_latest_prices())
+            print(f"Published price snapshot {version} to {PRICE_SNAPSHOT_PATH}")
+        except Exception as e:
+            # Workers keep serving the previous snapshot
+            print(f"Error publishing price snapshot: {e}")
 
     def get_latest_prices(self, limit: int = 100) -> List[Dict]:
-        """Get latest prices for all products"""
+        """Get latest prices for all products (served from the shared snapshot)"""
 
         try:
-            # Query the latest_prices view
+            rows = self.price_cache.get_rows(self._load_latest_prices)
+            return rows[:limit]
+        except Exception as e:
+            print(f"Error getting latest prices: {e}")
+            return []
+
+    def search_latest_prices(self, model_query: str) -> List[Dict]:
+        """Get latest prices whose product name or model contains model_query"""
+
+        try:
+            return self.price_cache.search(self._load_latest_prices, model_query)
+        except Exception as e:
+            print(f"Error searching latest prices: {e}")
+            return []
+
+    def _load_latest_prices(self) -> List[Dict]:
+        """Read the whole latest_prices view for the snapshot"""
+        rows = []
+        start = 0
+
+        while True:
+            # Ties on last_updated are common (one scrape shares a timestamp), so the
+            # sort needs tie-breakers; postgrest-py only sends one order param
             result = self.client.table('latest_prices')\
                 .select('*')\
-                .order('last_updated', desc=True)\
-                .limit(limit)\
+                .order('last_updated.desc,product_id,retailer_id')\
+                .range(start, start + SNAPSHOT_PAGE_SIZE - 1)\
                 .execute()
 
-            return [
-                {
-                    'product_id': row['product_id'],
-                    'product_name': row['product_name'],
-                    'brand': row['brand'],
-                    'model': row['model'],
-                    'slug': row['slug'],
-                    'retailer_name': row['retailer'],  # View column is 'retailer'
-                    'price_cash': float(row['price']) if row.get('price') else None,  # View column is 'price'
-                    'original_price': float(row['original_price']) if row.get('original_price') else None,
-                    'in_stock': row['in_stock'],
-                    'stock_status': row['stock_status'],
-                    'promo_text': row.get('promo_text'),
-                    'url': row.get('url'),  # View column is 'url'
-                    'last_updated': row['last_updated']
-                }
-                for row in result.data
-            ]
-        except Exception as e:
-            print(f"Error getting latest prices: {e}")
-            return []
+            rows.extend(format_latest_price(row) for row in result.data)
+
+            if len(result.data) < SNAPSHOT_PAGE_SIZE:
+                return rows
+            start += SNAPSHOT_PAGE_SIZE
 
     def get_dashboard_stats(self) -> Dict:
         """Get statistics for dashboard"""
@@ -169,14 +405,7 @@ class DatabaseManager:
             result = self.client.table('dashboard_stats').select('*').execute()
 
             if result.data:
-                row = result.data[0]
-                return {
-                    'total_products': row['total_products'],
-                    'active_retailers': row['active_retailers'],
-                    'products_in_stock': row['products_in_stock'],
-                    'active_promotions': row['active_promotions'],
-                    'last_scrape_time': row.get('last_scrape_time')
-                }
+                return format_dashboard_stats(result.data[0])
             return {}
         except Exception as e:
             print(f"Error getting dashboard stats: {e}")
@@ -202,30 +431,10 @@ class DatabaseManager:
             prices_response = self.client.table('latest_prices')\
                 .select('*')\
                 .eq('product_id', product_id)\
-                .order('price_cash')\
+                .order('price')\
                 .execute()
 
-            return {
-                'id': product['id'],
-                'name': product['name'],
-                'brand': product['brand'],
-                'model': product['model'],
-                'variant': product.get('variant'),
-                'slug': product['slug'],
-                'prices': [
-                    {
-                        'retailer': row['retailer'],  # View column is 'retailer'
-                        'price': float(row['price']) if row.get('price') else None,  # View column is 'price'
-                        'original_price': float(row['original_price']) if row.get('original_price') else None,
-                        'in_stock': row['in_stock'],
-                        'stock_status': row['stock_status'],
-                        'promo_text': row.get('promo_text'),
-                        'url': row.get('url'),  # View column is 'url'
-                        'last_updated': row['last_updated']
-                    }
-                    for row in prices_response.data
-                ]
-            }
+            return format_product(product, prices_response.data)
         except Exception as e:
             print(f"Error getting product by slug: {e}")
             return None
@@ -239,19 +448,7 @@ class DatabaseManager:
                 .limit(limit)\
                 .execute()
 
-            logs = [
-                {
-                    'id': row['id'],
-                    'retailer': row['retailer'],
-                    'status': row['status'],
-                    'products_found': row.get('products_found', 0),
-                    'products_saved': row.get('products_saved', 0),
-                    'errors': row.get('errors'),
-                    'execution_time_ms': row.get('execution_time_ms'),
-                    'created_at': row['created_at']
-                }
-                for row in result.data
-            ]
+            logs = [format_scraper_log(row) for row in result.data]
 
             return {
                 'total_count': len(logs),
@@ -263,86 +460,92 @@ class DatabaseManager:
 
     async def save_scraped_product(self, product_data: Dict) -> bool:
         """Save detailed scraped product with full specifications"""
-        try:
-            # Generate slug from product name
-            slug = product_data['name'].lower().replace(' ', '-').replace('/', '-')
-            slug = ''.join(c for c in slug if c.isalnum() or c == '-')
+        return await self.save_scraped_products([product_data]) == 1
 
-            # Find or create product
-            product_response = self.client.table('products').select('id').eq('slug', slug).execute()
+    async def save_scraped_products(self, products: List[Dict]) -> int:
+        """Save a batch of detailed scraped products with full specifications in a few bulk requests"""
+        if not products:
+            return 0
 
-            if not product_response.data:
-                # Create new product with specifications
-                new_product = self.client.table('products').insert({
-                    'name': product_data['name'],
-                    'brand': product_data['brand'],
-                    'model': product_data['model'],
-                    'variant': product_data.get('variant', ''),
-                    'slug': slug,
-                    'specifications': product_data.get('specifications', {}),
-                    'images': product_data.get('images', [])
-                }).execute()
-                product_id = new_product.data[0]['id']
-            else:
-                product_id = product_response.data[0]['id']
-                # Update product with latest specs
-                self.client.table('products').update({
-                    'updated_at': datetime.now().isoformat(),
-                    'specifications': product_data.get('specifications', {}),
-                    'images': product_data.get('images', [])
-                }).eq('id', product_id).execute()
-
-            # Find retailer ID
-            retailer_response = self.client.table('retailers').select('id').eq('name', product_data['retailer']).execute()
-
-            if not retailer_response.data:
-                # Create retailer if doesn't exist
-                new_retailer = self.client.table('retailers').insert({
-                    'name': product_data['retailer'],
-                    'website_url': product_data.get('url', '').split('/product/')[0] if '/product/' in product_data.get('url', '') else ''
-                }).execute()
-                retailer_id = new_retailer.data[0]['id']
-            else:
-                retailer_id = retailer_response.data[0]['id']
-
-            # Find or create retailer link
-            link_response = self.client.table('retailer_links')\
-                .select('id')\
-                .eq('product_id', product_id)\
-                .eq('retailer_id', retailer_id)\
-                .execute()
+        try:
+            started = time.perf_counter()
+            self.identity_map.ensure_loaded(self.client)
+            retailer_ids = self._resolve_retailers(products)
+
+            entries = []
+            for product_data in products:
+                in_stock = product_data.get('in_stock', True)
+                entries.append({
+                    'retailer_id': retailer_ids[product_data['retailer']],
+                    'product': {
+                        'name': product_data['name'],
+                        'brand': product_data['brand'],
+                        'model': product_data['model'],
+                        'variant': product_data.get('variant', ''),
+                        'slug': scraped_product_slug(product_data['name']),
+                        'specifications': product_data.get('specifications', {}),
+                        'images': product_data.get('images', [])
+                    },
+                    'link': {
+                        'original_url': product_data.get('url'),
+                        'scraped_name': product_data['name']
+                    },
+                    'price': {
+                        'price_cash': product_data.get('price_cash'),
+                        'price_credit': product_data.get('price_credit'),
+                        'original_price': product_data.get('original_price'),
+                        'in_stock': in_stock,
+                        'stock_status': 'in_stock' if in_stock else 'out_of_stock'
+                    }
+                })
 
-            if not link_response.data:
-                new_link = self.client.table('retailer_links').insert({
-                    'product_id': product_id,
-                    'retailer_id': retailer_id,
-                    'original_url': product_data.get('url'),
-                    'scraped_name': product_data['name']
-                }).execute()
-                link_id = new_link.data[0]['id']
-            else:
-                link_id = link_response.data[0]['id']
-                self.client.table('retailer_links').update({
-                    'last_seen_at': datetime.now().isoformat(),
-                    'scraped_name': product_data['name'],
-                    'original_url': product_data.get('url')
-                }).eq('id', link_id).execute()
-
-            # Insert price record
-            self.client.table('prices').insert({
-                'link_id': link_id,
-                'price_cash': product_data.get('price_cash'),
-                'price_credit': product_data.get('price_credit'),
-                'original_price': product_data.get('original_price'),
-                'in_stock': product_data.get('in_stock', True),
-                'stock_status': 'in_stock' if product_data.get('in_stock', True) else 'out_of_stock'
-            }).execute()
+            saved, changed = self._bulk_save(entries)
+            if changed:
+                for retailer_name in {p['retailer'] for p in products}:
+                    self.refresh_retailer_stats(retailer_name)
+            self.publish_price_snapshot()
 
-            return True
+            print(f"Saved {saved} products ({changed} price changes) in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return saved
 
         except Exception as e:
-            print(f"Error saving scraped product: {e}")
-            return False
+            self.identity_map.clear()
+            print(f"Error saving scraped products: {e}")
+            return 0
+
+    def _resolve_retailers(self, products: List[Dict]) -> Dict[str, int]:
+        """Map each product's retailer name to its id, creating missing retailers"""
+        retailer_ids = self.identity_map.retailers
+
+        # Another process may have created them since the map was loaded
+        unknown = {product['retailer'] for product in products} - retailer_ids.keys()
+        if unknown:
+            self._find_retailers(unknown)
+
+        missing = {}
+        for product in products:
+            name = product['retailer']
+            if name in retailer_ids or name in missing:
+                continue
+            url = product.get('url', '')
+            missing[name] = {
+                'name': name,
+                'website_url': url.split('/product/')[0] if '/product/' in url else ''
+            }
+        if missing:
+            # Upsert, so a retailer another scraper creates concurrently doesn't fail the batch
+            created = self.client.table('retailers').upsert(list(missing.values()), on_conflict='name').execute()
+            self.identity_map.add_retailers(created.data)
+
+        return retailer_ids
+
+    def _find_retailers(self, names: Iterable[str]):
+        """Add existing retailers the identity map doesn't know yet"""
+        result = self.client.table('retailers')\
+            .select('id,name')\
+            .in_('name', list(names))\
+            .execute()
+        self.identity_map.add_retailers(result.data)
 
     def get_brand_comparison(self) -> Dict:
         """Compare average prices across brands"""
@@ -355,39 +558,7 @@ class DatabaseManager:
             else:
                 # Fallback: aggregate manually from latest_prices
                 prices = self.client.table('latest_prices').select('*').execute()
-                brands_data = {}
-
-                for row in prices.data:
-                    brand = row['brand']
-                    if brand not in brands_data:
-                        brands_data[brand] = {
-                            'brand': brand,
-                            'products': set(),
-                            'prices': [],
-                            'in_stock_count': 0
-                        }
-
-                    brands_data[brand]['products'].add(row['product_id'])
-                    if row.get('price_cash'):
-                        brands_data[brand]['prices'].append(float(row['price_cash']))
-                    if row.get('in_stock'):
-                        brands_data[brand]['in_stock_count'] += 1
-
-                # Calculate aggregates
-                brands = []
-                for brand, data in brands_data.items():
-                    if data['prices']:
-                        brands.append({
-                            'brand': brand,
-                            'product_count': len(data['products']),
-                            'avg_price': sum(data['prices']) / len(data['prices']),
-                            'min_price': min(data['prices']),
-                            'max_price': max(data['prices']),
-                            'in_stock_count': data['in_stock_count']
-                        })
-
-                brands.sort(key=lambda x: x['avg_price'], reverse=True)
-                return {'brands': brands}
+                return {'brands': aggregate_brand_comparison(prices.data)}
 
         except Exception as e:
             print(f"Error getting brand comparison: {e}")
@@ -0,0 +1,71 @@
+"""
+Process-level identity map for the ingest path
+Retailer and link ids are preloaded once per process and kept current as rows are written
+"""
+
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# PostgREST caps a single response, so each table is read in pages
+PRELOAD_PAGE_SIZE = 1000
+
+
+class IngestIdentityMap:
+    """Natural key -> id for retailers (name) and retailer links (product_id, retailer_id)
+
+    Product ids come back from the products upsert the save path does anyway,
+    so they don't need a map of their own.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.retailers: Dict[str, int] = {}
+        self.links: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, client):
+        """Preload every mapping on first use: one paged read per table"""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            self.add_retailers(self._read_all(client, 'retailers', 'id,name'))
+            self.add_links(self._read_all(client, 'retailer_links', 'id,product_id,retailer_id'))
+            self.loaded = True
+            print(f"Identity map loaded: {len(self.retailers)} retailers, {len(self.links)} links")
+
+    @staticmethod
+    def _read_all(client, table: str, columns: str) -> List[Dict]:
+        """All rows of a table, id order"""
+        rows = []
+        start = 0
+        while True:
+            result = client.table(table)\
+                .select(columns)\
+                .order('id')\
+                .range(start, start + PRELOAD_PAGE_SIZE - 1)\
+                .execute()
+            rows.extend(result.data)
+            if len(result.data) < PRELOAD_PAGE_SIZE:
+                return rows
+            start += PRELOAD_PAGE_SIZE
+
+    def add_retailers(self, rows: Iterable[Dict]):
+        """Record retailers rows (need id and name)"""
+        self.retailers.update({row['name']: row['id'] for row in rows})
+
+    def add_links(self, rows: Iterable[Dict]):
+        """Record retailer_links rows (need id, product_id and retailer_id)"""
+        self.links.update({(row['product_id'], row['retailer_id']): row['id'] for row in rows})
+
+    def clear(self):
+        """Forget everything; the next ingest preloads again (called when a save fails, as ids may be stale)"""
+        with self._lock:
+            self.retailers.clear()
+            self.links.clear()
+            self.loaded = False
+
+
+# Shared by every DatabaseManager in this process
+ingest_identity_map = IngestIdentityMap()
@@ -0,0 +1,47 @@
+-- Migration: Server-side bucketed price history
+-- Lets /api/products/{slug}/price-history fetch one row per retailer per time bucket
+-- instead of every scrape observation
+
+-- date_bin (PostgreSQL 14+) is the plain-Postgres equivalent of TimescaleDB's time_bucket,
+-- so the same function works on Supabase and on the TimescaleDB deployment.
+-- The prices scan is driven by idx_prices_link_time (link_id, time DESC).
+CREATE OR REPLACE FUNCTION get_price_history_buckets(
+    p_slug TEXT,
+    p_days INT DEFAULT 30,
+    p_bucket_seconds INT DEFAULT 3600,
+    p_retailer TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    bucket TIMESTAMPTZ,
+    retailer TEXT,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    avg_price NUMERIC,
+    last_price NUMERIC,
+    in_stock BOOLEAN,
+    observations BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        date_bin(make_interval(secs => p_bucket_seconds), pr.time, TIMESTAMPTZ '2000-01-01') AS bucket,
+        r.name::TEXT AS retailer,
+        MIN(pr.price_cash) AS min_price,
+        MAX(pr.price_cash) AS max_price,
+        ROUND(AVG(pr.price_cash), 2) AS avg_price,
+        (ARRAY_AGG(pr.price_cash ORDER BY pr.time DESC))[1] AS last_price,
+        (ARRAY_AGG(pr.in_stock ORDER BY pr.time DESC))[1] AS in_stock,
+        COUNT(*) AS observations
+    FROM products p
+    JOIN retailer_links rl ON rl.product_id = p.id
+    JOIN retailers r ON r.id = rl.retailer_id
+    JOIN prices pr ON pr.link_id = rl.id
+    WHERE p.slug = p_slug
+      AND pr.time >= NOW() - make_interval(days => p_days)
+      AND pr.price_cash IS NOT NULL
+      AND (p_retailer IS NULL OR r.name = p_retailer)
+    GROUP BY 1, 2
+    ORDER BY 2, 1;
+$$;
+
+COMMENT ON FUNCTION get_price_history_buckets IS 'Per-retailer min/max/avg/last price of a product in fixed time buckets over the last p_days';
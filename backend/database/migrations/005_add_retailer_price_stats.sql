@@ -0,0 +1,57 @@
+-- Migration: Precomputed retailer comparison aggregates
+-- /api/market/retailer-comparison reads this small table; it is refreshed per retailer
+-- by the save path after a scrape commits, never on the request path
+
+CREATE TABLE IF NOT EXISTS retailer_price_stats (
+    retailer_id INT PRIMARY KEY REFERENCES retailers(id) ON DELETE CASCADE,
+    retailer VARCHAR(100) NOT NULL,
+    product_count INT NOT NULL DEFAULT 0,
+    avg_price NUMERIC(10, 2),
+    min_price NUMERIC(10, 2),
+    max_price NUMERIC(10, 2),
+    in_stock_count INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Recompute one retailer's row from its links' latest prices.
+-- Each link's latest price is a single idx_prices_link_time lookup, so this
+-- touches one row per link instead of the full prices history.
+CREATE OR REPLACE FUNCTION refresh_retailer_price_stats(p_retailer_name TEXT)
+RETURNS VOID
+LANGUAGE sql VOLATILE
+AS $$
+    INSERT INTO retailer_price_stats (
+        retailer_id, retailer, product_count, avg_price, min_price, max_price, in_stock_count, refreshed_at
+    )
+    SELECT
+        r.id,
+        r.name,
+        COUNT(DISTINCT rl.product_id) FILTER (WHERE lp.link_id IS NOT NULL),
+        ROUND(AVG(lp.price_cash), 2),
+        MIN(lp.price_cash),
+        MAX(lp.price_cash),
+        COUNT(*) FILTER (WHERE lp.in_stock),
+        NOW()
+    FROM retailers r
+    LEFT JOIN retailer_links rl ON rl.retailer_id = r.id AND rl.is_active = TRUE
+    LEFT JOIN LATERAL (
+        SELECT pr.link_id, pr.price_cash, pr.in_stock
+        FROM prices pr
+        WHERE pr.link_id = rl.id
+        ORDER BY pr.time DESC
+        LIMIT 1
+    ) lp ON TRUE
+    WHERE r.name = p_retailer_name
+    GROUP BY r.id, r.name
+    ON CONFLICT (retailer_id) DO UPDATE SET
+        retailer = EXCLUDED.retailer,
+        product_count = EXCLUDED.product_count,
+        avg_price = EXCLUDED.avg_price,
+        min_price = EXCLUDED.min_price,
+        max_price = EXCLUDED.max_price,
+        in_stock_count = EXCLUDED.in_stock_count,
+        refreshed_at = EXCLUDED.refreshed_at;
+$$;
+
+-- Seed every retailer once
+SELECT refresh_retailer_price_stats(name) FROM retailers;
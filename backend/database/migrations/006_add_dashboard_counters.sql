@@ -0,0 +1,177 @@
+-- Migration: Incrementally maintained dashboard counters
+-- dashboard_stats used to recount products and scan latest_prices on every call.
+-- Statement-level triggers now keep a single counters row up to date as rows are
+-- written, so reading the view is O(1) however large prices grows.
+
+-- Supabase schema (schema_supabase.sql) only. On the TimescaleDB deployment
+-- (schema.sql / docker-compose) prices is a hypertable, which can't have triggers with
+-- transition tables, and scraper_logs has scraped_at rather than created_at. Stop
+-- before changing anything rather than fail halfway through.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'timescaledb') THEN
+        IF EXISTS (SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = 'prices') THEN
+            RAISE EXCEPTION '006_add_dashboard_counters targets the Supabase schema, but prices is a TimescaleDB hypertable here';
+        END IF;
+    END IF;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),  -- single-row table
+    total_products BIGINT NOT NULL DEFAULT 0,
+    active_retailers BIGINT NOT NULL DEFAULT 0,
+    products_in_stock BIGINT NOT NULL DEFAULT 0,
+    last_scrape_time TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO dashboard_counters (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+-- Full recount, used to seed the row and to reconcile after manual maintenance
+-- (deleting prices, toggling retailer_links.is_active, ...)
+CREATE OR REPLACE FUNCTION refresh_dashboard_counters()
+RETURNS VOID
+LANGUAGE sql VOLATILE
+AS $$
+    UPDATE dashboard_counters SET
+        total_products = (SELECT COUNT(*) FROM products),
+        active_retailers = (SELECT COUNT(*) FROM retailers WHERE is_active = TRUE),
+        products_in_stock = (SELECT COUNT(*) FROM latest_prices WHERE in_stock = TRUE),
+        last_scrape_time = (SELECT MAX(created_at) FROM scraper_logs),
+        updated_at = NOW()
+    WHERE id;
+$$;
+
+-- products: +inserted, -deleted
+CREATE OR REPLACE FUNCTION dashboard_counters_products_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE dashboard_counters
+    SET total_products = total_products + (SELECT COUNT(*) FROM new_rows),
+        updated_at = NOW()
+    WHERE id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION dashboard_counters_products_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE dashboard_counters
+    SET total_products = total_products - (SELECT COUNT(*) FROM old_rows),
+        updated_at = NOW()
+    WHERE id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_dashboard_counters_products_insert ON products;
+CREATE TRIGGER trg_dashboard_counters_products_insert
+    AFTER INSERT ON products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counters_products_insert();
+
+DROP TRIGGER IF EXISTS trg_dashboard_counters_products_delete ON products;
+CREATE TRIGGER trg_dashboard_counters_products_delete
+    AFTER DELETE ON products
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counters_products_delete();
+
+-- retailers: a handful of rows, so recount on any change
+CREATE OR REPLACE FUNCTION dashboard_counters_retailers()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE dashboard_counters
+    SET active_retailers = (SELECT COUNT(*) FROM retailers WHERE is_active = TRUE),
+        updated_at = NOW()
+    WHERE id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_dashboard_counters_retailers ON retailers;
+CREATE TRIGGER trg_dashboard_counters_retailers
+    AFTER INSERT OR UPDATE OF is_active OR DELETE ON retailers
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counters_retailers();
+
+-- prices: each new observation replaces its link's previous one in latest_prices,
+-- so the in-stock count moves by (new in_stock) - (previous in_stock).
+-- The previous observation is one idx_prices_link_time lookup per inserted row;
+-- several rows for one link in a statement telescope to the right total.
+CREATE OR REPLACE FUNCTION dashboard_counters_prices()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    delta BIGINT;
+BEGIN
+    SELECT COALESCE(SUM(
+        (CASE WHEN n.in_stock THEN 1 ELSE 0 END) -
+        (CASE WHEN (
+            SELECT p.in_stock FROM prices p
+            WHERE p.link_id = n.link_id AND p.time < n.time
+            ORDER BY p.time DESC
+            LIMIT 1
+        ) THEN 1 ELSE 0 END)
+    ), 0)
+    INTO delta
+    FROM new_rows n
+    JOIN retailer_links rl ON rl.id = n.link_id AND rl.is_active = TRUE;
+
+    IF delta <> 0 THEN
+        UPDATE dashboard_counters
+        SET products_in_stock = products_in_stock + delta,
+            updated_at = NOW()
+        WHERE id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_dashboard_counters_prices ON prices;
+CREATE TRIGGER trg_dashboard_counters_prices
+    AFTER INSERT ON prices
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counters_prices();
+
+-- scraper_logs: latest scrape time only ever moves forward
+CREATE OR REPLACE FUNCTION dashboard_counters_scraper_logs()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE dashboard_counters
+    SET last_scrape_time = GREATEST(last_scrape_time, (SELECT MAX(created_at) FROM new_rows)),
+        updated_at = NOW()
+    WHERE id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_dashboard_counters_scraper_logs ON scraper_logs;
+CREATE TRIGGER trg_dashboard_counters_scraper_logs
+    AFTER INSERT ON scraper_logs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counters_scraper_logs();
+
+-- Same columns as before, now read from the counters row.
+-- active_promotions depends on CURRENT_DATE, so it stays a query, but a cheap one
+-- answered from the partial index idx_promotions_active.
+CREATE OR REPLACE VIEW dashboard_stats AS
+SELECT
+    c.total_products,
+    c.active_retailers,
+    c.products_in_stock,
+    (SELECT COUNT(*) FROM promotions WHERE is_active = TRUE AND (end_date IS NULL OR end_date >= CURRENT_DATE)) as active_promotions,
+    c.last_scrape_time
+FROM dashboard_counters c
+WHERE c.id;
+
+SELECT refresh_dashboard_counters();
@@ -0,0 +1,29 @@
+-- Migration: Report when a price was last confirmed, not just when it last changed
+-- The save path now only writes a prices row when price or stock changed; a scrape that
+-- sees the same listing again just bumps retailer_links.last_seen_at. latest_prices keeps
+-- picking the newest prices row per link, but last_updated now also counts those
+-- confirmations, so a stable price doesn't look stale.
+
+CREATE OR REPLACE VIEW latest_prices AS
+SELECT DISTINCT ON (rl.product_id, rl.retailer_id)
+    p.id as product_id,
+    p.name as product_name,
+    p.brand,
+    p.model,
+    p.slug,
+    r.id as retailer_id,
+    r.name as retailer,
+    pr.price_cash as price,
+    pr.price_credit,
+    pr.original_price,
+    pr.in_stock,
+    pr.stock_status,
+    pr.promo_text,
+    rl.original_url as url,
+    GREATEST(pr.time, rl.last_seen_at) as last_updated
+FROM products p
+JOIN retailer_links rl ON p.id = rl.product_id
+JOIN retailers r ON rl.retailer_id = r.id
+JOIN prices pr ON rl.id = pr.link_id
+WHERE rl.is_active = TRUE
+ORDER BY rl.product_id, rl.retailer_id, pr.time DESC;
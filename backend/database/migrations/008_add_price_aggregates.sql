@@ -0,0 +1,55 @@
+-- Migration: Continuous aggregates for the prices hypertable
+-- History and analytics queries used to scan raw prices rows, which grow with every
+-- scrape. Hourly and daily rollups per link are now maintained by TimescaleDB in the
+-- background; 011 adds their refresh policies, compression and the readers.
+
+-- TimescaleDB deployment only (schema.sql); Supabase keeps using
+-- get_price_history_buckets from 010.
+
+-- Run this file outside a transaction block, one statement at a time: neither
+-- CREATE MATERIALIZED VIEW ... WITH (timescaledb.continuous) nor
+-- refresh_continuous_aggregate can run inside one. psql -f does this by default
+-- (don't pass --single-transaction or -1).
+
+-- Prices rows are only written when an observation changes, so a bucket exists only
+-- where something changed. Readers carry last_price forward over empty buckets, and
+-- in_stock_ratio is the share of change rows that were in stock, not a time-weighted
+-- availability.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS prices_hourly
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket(INTERVAL '1 hour', time) AS bucket,
+    link_id,
+    MIN(price_cash) AS min_price,
+    MAX(price_cash) AS max_price,
+    AVG(price_cash) AS avg_price,
+    last(price_cash, time) AS last_price,
+    last(in_stock, time) AS last_in_stock,
+    AVG(CASE WHEN in_stock THEN 1.0 ELSE 0.0 END) AS in_stock_ratio,
+    COUNT(*) AS observations
+FROM prices
+GROUP BY bucket, link_id
+WITH NO DATA;
+
+-- Built from the raw hypertable rather than stacked on prices_hourly, so it works on
+-- TimescaleDB releases without hierarchical aggregates
+CREATE MATERIALIZED VIEW IF NOT EXISTS prices_daily
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket(INTERVAL '1 day', time) AS bucket,
+    link_id,
+    MIN(price_cash) AS min_price,
+    MAX(price_cash) AS max_price,
+    AVG(price_cash) AS avg_price,
+    last(price_cash, time) AS last_price,
+    last(in_stock, time) AS last_in_stock,
+    AVG(CASE WHEN in_stock THEN 1.0 ELSE 0.0 END) AS in_stock_ratio,
+    COUNT(*) AS observations
+FROM prices
+GROUP BY bucket, link_id
+WITH NO DATA;
+
+-- Backfill the history that existed before this migration
+CALL refresh_continuous_aggregate('prices_hourly', NULL, NOW() - INTERVAL '1 hour');
+CALL refresh_continuous_aggregate('prices_daily', NULL, NOW() - INTERVAL '1 day');
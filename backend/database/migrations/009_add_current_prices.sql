@@ -0,0 +1,272 @@
+-- Migration: Materialized latest price per retailer link
+-- latest_prices used to DISTINCT ON over the whole prices table on every read, and
+-- dashboard_stats and the API snapshot read it. current_prices now holds one row per
+-- link, upserted by a trigger as prices rows are inserted, and latest_prices and the
+-- retailer stats refresh read it, so reads cost one row per link however much history
+-- accumulates.
+
+-- Runs on both deployments. On Supabase the triggers are statement-level with
+-- transition tables. On the TimescaleDB deployment (schema.sql / docker-compose),
+-- prices is a hypertable, which can't have those, so the same work is done per row,
+-- and latest_prices keeps schema.sql's column names.
+
+CREATE TABLE IF NOT EXISTS current_prices (
+    link_id INT PRIMARY KEY REFERENCES retailer_links(id) ON DELETE CASCADE,
+    time TIMESTAMPTZ NOT NULL,
+    price_cash NUMERIC(10, 2),
+    price_credit NUMERIC(10, 2),
+    original_price NUMERIC(10, 2),
+    currency VARCHAR(3),
+    in_stock BOOLEAN,
+    stock_status VARCHAR(50),
+    promo_text TEXT
+);
+
+-- Seed from existing history: one idx_prices_link_time probe per link
+INSERT INTO current_prices (link_id, time, price_cash, price_credit, original_price, currency, in_stock, stock_status, promo_text)
+SELECT rl.id, pr.time, pr.price_cash, pr.price_credit, pr.original_price, pr.currency, pr.in_stock, pr.stock_status, pr.promo_text
+FROM retailer_links rl
+CROSS JOIN LATERAL (
+    SELECT p.time, p.price_cash, p.price_credit, p.original_price, p.currency, p.in_stock, p.stock_status, p.promo_text
+    FROM prices p
+    WHERE p.link_id = rl.id
+    ORDER BY p.time DESC
+    LIMIT 1
+) pr
+ON CONFLICT (link_id) DO NOTHING;
+
+-- prices insert: upsert each link's newest inserted row, unless current_prices already
+-- holds a newer one (a backfill of old observations). This also moves the dashboard
+-- in-stock counter, replacing 006's trigger: the previous observation is the
+-- current_prices row being replaced, rather than a lookup into prices per row.
+CREATE OR REPLACE FUNCTION current_prices_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    delta BIGINT;
+BEGIN
+    -- Every part of the statement sees current_prices as it was before the upsert,
+    -- so previous holds the rows being replaced
+    WITH latest AS (
+        SELECT DISTINCT ON (n.link_id)
+            n.link_id, n.time, n.price_cash, n.price_credit, n.original_price, n.currency, n.in_stock, n.stock_status, n.promo_text
+        FROM new_rows n
+        LEFT JOIN current_prices c ON c.link_id = n.link_id
+        WHERE c.link_id IS NULL OR c.time <= n.time
+        ORDER BY n.link_id, n.time DESC
+    ),
+    previous AS (
+        SELECT l.link_id, l.in_stock AS new_in_stock, c.in_stock AS old_in_stock
+        FROM latest l
+        LEFT JOIN current_prices c ON c.link_id = l.link_id
+    ),
+    upserted AS (
+        INSERT INTO current_prices (link_id, time, price_cash, price_credit, original_price, currency, in_stock, stock_status, promo_text)
+        SELECT link_id, time, price_cash, price_credit, original_price, currency, in_stock, stock_status, promo_text
+        FROM latest
+        ON CONFLICT (link_id) DO UPDATE SET
+            time = EXCLUDED.time,
+            price_cash = EXCLUDED.price_cash,
+            price_credit = EXCLUDED.price_credit,
+            original_price = EXCLUDED.original_price,
+            currency = EXCLUDED.currency,
+            in_stock = EXCLUDED.in_stock,
+            stock_status = EXCLUDED.stock_status,
+            promo_text = EXCLUDED.promo_text
+    )
+    SELECT COALESCE(SUM(
+        (CASE WHEN pv.new_in_stock THEN 1 ELSE 0 END) -
+        (CASE WHEN pv.old_in_stock THEN 1 ELSE 0 END)
+    ), 0)
+    INTO delta
+    FROM previous pv
+    JOIN retailer_links rl ON rl.id = pv.link_id AND rl.is_active = TRUE;
+
+    IF delta <> 0 THEN
+        UPDATE dashboard_counters
+        SET products_in_stock = products_in_stock + delta,
+            updated_at = NOW()
+        WHERE id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- prices delete (manual maintenance): fall back to each affected link's newest
+-- remaining row, then recount the dashboard
+CREATE OR REPLACE FUNCTION current_prices_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM current_prices
+    WHERE link_id IN (SELECT DISTINCT link_id FROM old_rows);
+
+    INSERT INTO current_prices (link_id, time, price_cash, price_credit, original_price, currency, in_stock, stock_status, promo_text)
+    SELECT DISTINCT ON (p.link_id)
+        p.link_id, p.time, p.price_cash, p.price_credit, p.original_price, p.currency, p.in_stock, p.stock_status, p.promo_text
+    FROM prices p
+    WHERE p.link_id IN (SELECT DISTINCT link_id FROM old_rows)
+    ORDER BY p.link_id, p.time DESC;
+
+    PERFORM refresh_dashboard_counters();
+    RETURN NULL;
+END;
+$$;
+
+-- Row-level equivalents for the hypertable. dashboard_counters (006) only exists on
+-- Supabase, so there is no counter to move here.
+CREATE OR REPLACE FUNCTION current_prices_insert_row()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO current_prices (link_id, time, price_cash, price_credit, original_price, currency, in_stock, stock_status, promo_text)
+    VALUES (NEW.link_id, NEW.time, NEW.price_cash, NEW.price_credit, NEW.original_price, NEW.currency, NEW.in_stock, NEW.stock_status, NEW.promo_text)
+    ON CONFLICT (link_id) DO UPDATE SET
+        time = EXCLUDED.time,
+        price_cash = EXCLUDED.price_cash,
+        price_credit = EXCLUDED.price_credit,
+        original_price = EXCLUDED.original_price,
+        currency = EXCLUDED.currency,
+        in_stock = EXCLUDED.in_stock,
+        stock_status = EXCLUDED.stock_status,
+        promo_text = EXCLUDED.promo_text
+    WHERE current_prices.time <= EXCLUDED.time;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION current_prices_delete_row()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM current_prices WHERE link_id = OLD.link_id;
+
+    INSERT INTO current_prices (link_id, time, price_cash, price_credit, original_price, currency, in_stock, stock_status, promo_text)
+    SELECT p.link_id, p.time, p.price_cash, p.price_credit, p.original_price, p.currency, p.in_stock, p.stock_status, p.promo_text
+    FROM prices p
+    WHERE p.link_id = OLD.link_id
+    ORDER BY p.time DESC
+    LIMIT 1;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_dashboard_counters_prices ON prices;
+DROP FUNCTION IF EXISTS dashboard_counters_prices();
+
+DROP TRIGGER IF EXISTS trg_current_prices_insert ON prices;
+DROP TRIGGER IF EXISTS trg_current_prices_delete ON prices;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'timescaledb')
+       AND EXISTS (SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = 'prices') THEN
+        CREATE TRIGGER trg_current_prices_insert
+            AFTER INSERT ON prices
+            FOR EACH ROW EXECUTE FUNCTION current_prices_insert_row();
+
+        CREATE TRIGGER trg_current_prices_delete
+            AFTER DELETE ON prices
+            FOR EACH ROW EXECUTE FUNCTION current_prices_delete_row();
+
+        -- Same columns as schema.sql
+        CREATE OR REPLACE VIEW latest_prices AS
+        SELECT
+            p.id as product_id,
+            p.name as product_name,
+            p.brand,
+            p.model,
+            p.slug,
+            r.id as retailer_id,
+            r.name as retailer_name,
+            cp.price_cash,
+            cp.price_credit,
+            cp.original_price,
+            cp.in_stock,
+            cp.stock_status,
+            cp.promo_text,
+            rl.original_url,
+            GREATEST(cp.time, rl.last_seen_at) as last_updated
+        FROM current_prices cp
+        JOIN retailer_links rl ON rl.id = cp.link_id
+        JOIN products p ON p.id = rl.product_id
+        JOIN retailers r ON r.id = rl.retailer_id
+        WHERE rl.is_active = TRUE;
+    ELSE
+        CREATE TRIGGER trg_current_prices_insert
+            AFTER INSERT ON prices
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION current_prices_insert();
+
+        CREATE TRIGGER trg_current_prices_delete
+            AFTER DELETE ON prices
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION current_prices_delete();
+
+        -- Same columns as 007; UNIQUE (product_id, retailer_id) on retailer_links means
+        -- one row per product per retailer without DISTINCT ON
+        CREATE OR REPLACE VIEW latest_prices AS
+        SELECT
+            p.id as product_id,
+            p.name as product_name,
+            p.brand,
+            p.model,
+            p.slug,
+            r.id as retailer_id,
+            r.name as retailer,
+            cp.price_cash as price,
+            cp.price_credit,
+            cp.original_price,
+            cp.in_stock,
+            cp.stock_status,
+            cp.promo_text,
+            rl.original_url as url,
+            GREATEST(cp.time, rl.last_seen_at) as last_updated
+        FROM current_prices cp
+        JOIN retailer_links rl ON rl.id = cp.link_id
+        JOIN products p ON p.id = rl.product_id
+        JOIN retailers r ON r.id = rl.retailer_id
+        WHERE rl.is_active = TRUE;
+
+        -- Counters seeded by 006 counted the old view; recount against the new one
+        PERFORM refresh_dashboard_counters();
+    END IF;
+END;
+$$;
+
+-- Same as 005, with each link's latest price read from current_prices instead of
+-- a lookup into prices per link
+CREATE OR REPLACE FUNCTION refresh_retailer_price_stats(p_retailer_name TEXT)
+RETURNS VOID
+LANGUAGE sql VOLATILE
+AS $$
+    INSERT INTO retailer_price_stats (
+        retailer_id, retailer, product_count, avg_price, min_price, max_price, in_stock_count, refreshed_at
+    )
+    SELECT
+        r.id,
+        r.name,
+        COUNT(DISTINCT rl.product_id) FILTER (WHERE cp.link_id IS NOT NULL),
+        ROUND(AVG(cp.price_cash), 2),
+        MIN(cp.price_cash),
+        MAX(cp.price_cash),
+        COUNT(*) FILTER (WHERE cp.in_stock),
+        NOW()
+    FROM retailers r
+    LEFT JOIN retailer_links rl ON rl.retailer_id = r.id AND rl.is_active = TRUE
+    LEFT JOIN current_prices cp ON cp.link_id = rl.id
+    WHERE r.name = p_retailer_name
+    GROUP BY r.id, r.name
+    ON CONFLICT (retailer_id) DO UPDATE SET
+        retailer = EXCLUDED.retailer,
+        product_count = EXCLUDED.product_count,
+        avg_price = EXCLUDED.avg_price,
+        min_price = EXCLUDED.min_price,
+        max_price = EXCLUDED.max_price,
+        in_stock_count = EXCLUDED.in_stock_count,
+        refreshed_at = EXCLUDED.refreshed_at;
+$$;
@@ -0,0 +1,71 @@
+-- Migration: Carry prices into the price history window
+-- Since 007, prices only gets a row when an observation changes, so a price that held
+-- for the whole window had no rows inside it and its history came back empty.
+-- get_price_history_buckets now seeds each link with its last row from before the
+-- window, placed at the window start, and reports how many of a bucket's rows are
+-- changes recorded inside the window rather than counting scrapes.
+
+-- The result column is renamed, so the function has to be dropped first
+DROP FUNCTION IF EXISTS get_price_history_buckets(TEXT, INT, INT, TEXT);
+
+CREATE FUNCTION get_price_history_buckets(
+    p_slug TEXT,
+    p_days INT DEFAULT 30,
+    p_bucket_seconds INT DEFAULT 3600,
+    p_retailer TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    bucket TIMESTAMPTZ,
+    retailer TEXT,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    avg_price NUMERIC,
+    last_price NUMERIC,
+    in_stock BOOLEAN,
+    changes BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH links AS (
+        SELECT rl.id, r.name::TEXT AS retailer, NOW() - make_interval(days => p_days) AS window_start
+        FROM products p
+        JOIN retailer_links rl ON rl.product_id = p.id
+        JOIN retailers r ON r.id = rl.retailer_id
+        WHERE p.slug = p_slug
+          AND (p_retailer IS NULL OR r.name = p_retailer)
+    ),
+    observations AS (
+        -- The price each link held going into the window (one idx_prices_link_time probe)
+        SELECT l.retailer, l.window_start AS time, seed.price_cash, seed.in_stock, FALSE AS is_change
+        FROM links l
+        CROSS JOIN LATERAL (
+            SELECT pr.price_cash, pr.in_stock
+            FROM prices pr
+            WHERE pr.link_id = l.id
+              AND pr.time < l.window_start
+              AND pr.price_cash IS NOT NULL
+            ORDER BY pr.time DESC
+            LIMIT 1
+        ) seed
+        UNION ALL
+        SELECT l.retailer, pr.time, pr.price_cash, pr.in_stock, TRUE AS is_change
+        FROM links l
+        JOIN prices pr ON pr.link_id = l.id
+        WHERE pr.time >= l.window_start
+          AND pr.price_cash IS NOT NULL
+    )
+    SELECT
+        date_bin(make_interval(secs => p_bucket_seconds), o.time, TIMESTAMPTZ '2000-01-01') AS bucket,
+        o.retailer,
+        MIN(o.price_cash) AS min_price,
+        MAX(o.price_cash) AS max_price,
+        ROUND(AVG(o.price_cash), 2) AS avg_price,
+        (ARRAY_AGG(o.price_cash ORDER BY o.time DESC, o.is_change DESC))[1] AS last_price,
+        (ARRAY_AGG(o.in_stock ORDER BY o.time DESC, o.is_change DESC))[1] AS in_stock,
+        COUNT(*) FILTER (WHERE o.is_change) AS changes
+    FROM observations o
+    GROUP BY 1, 2
+    ORDER BY 2, 1;
+$$;
+
+COMMENT ON FUNCTION get_price_history_buckets IS 'Per-retailer min/max/avg/last price of a product in fixed time buckets over the last p_days, starting from the price each retailer held when the window opened';
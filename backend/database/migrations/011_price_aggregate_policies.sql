@@ -0,0 +1,169 @@
+-- Migration: Policies, compression and readers for the price aggregates
+-- TimescaleDB deployment only, after 008 and 010. Unlike 008 this file runs fine in
+-- a single transaction.
+
+CREATE INDEX IF NOT EXISTS idx_prices_hourly_link_bucket ON prices_hourly(link_id, bucket DESC);
+CREATE INDEX IF NOT EXISTS idx_prices_daily_link_bucket ON prices_daily(link_id, bucket DESC);
+
+-- Materialize everything but the newest bucket; real-time aggregation
+-- (materialized_only = false) covers the rest from raw rows
+SELECT add_continuous_aggregate_policy('prices_hourly',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('prices_daily',
+    start_offset => INTERVAL '7 days',
+    end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 hour',
+    if_not_exists => TRUE);
+
+-- Compression: one segment per link, newest first, which is the order both the
+-- latest-row lookup on the save path and the history readers scan in
+ALTER TABLE prices SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'link_id',
+    timescaledb.compress_orderby = 'time DESC'
+);
+
+-- (Re)schedule compression of chunks older than p_days; run
+-- SELECT set_price_compression_policy(<days>) to change the age without another migration
+CREATE OR REPLACE FUNCTION set_price_compression_policy(p_days INT DEFAULT 30)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM remove_compression_policy('prices', if_exists => TRUE);
+    RETURN add_compression_policy('prices', make_interval(days => p_days));
+END;
+$$;
+
+COMMENT ON FUNCTION set_price_compression_policy IS 'Replace the prices compression policy so chunks older than p_days are compressed; returns the job id';
+
+SELECT set_price_compression_policy(30);
+
+-- Same signature as 010's get_price_history_buckets. On this deployment, buckets
+-- of whole hours or days are built from prices_hourly or prices_daily instead of
+-- raw rows. Narrower buckets still read raw rows, with the same query as 010. Results have the same shape and the same seeding: the price
+-- each link held going into the window is placed at the window start.
+CREATE OR REPLACE FUNCTION get_price_history_buckets(
+    p_slug TEXT,
+    p_days INT DEFAULT 30,
+    p_bucket_seconds INT DEFAULT 3600,
+    p_retailer TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    bucket TIMESTAMPTZ,
+    retailer TEXT,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    avg_price NUMERIC,
+    last_price NUMERIC,
+    in_stock BOOLEAN,
+    changes BIGINT
+)
+LANGUAGE plpgsql STABLE
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_rollup TEXT := CASE
+        WHEN p_bucket_seconds % 86400 = 0 THEN 'prices_daily'
+        WHEN p_bucket_seconds % 3600 = 0 THEN 'prices_hourly'
+    END;
+BEGIN
+    IF v_rollup IS NULL THEN
+        RETURN QUERY
+        WITH links AS (
+            SELECT rl.id, r.name::TEXT AS retailer, NOW() - make_interval(days => p_days) AS window_start
+            FROM products p
+            JOIN retailer_links rl ON rl.product_id = p.id
+            JOIN retailers r ON r.id = rl.retailer_id
+            WHERE p.slug = p_slug
+              AND (p_retailer IS NULL OR r.name = p_retailer)
+        ),
+        observations AS (
+            SELECT l.retailer, l.window_start AS time, seed.price_cash, seed.in_stock, FALSE AS is_change
+            FROM links l
+            CROSS JOIN LATERAL (
+                SELECT pr.price_cash, pr.in_stock
+                FROM prices pr
+                WHERE pr.link_id = l.id
+                  AND pr.time < l.window_start
+                  AND pr.price_cash IS NOT NULL
+                ORDER BY pr.time DESC
+                LIMIT 1
+            ) seed
+            UNION ALL
+            SELECT l.retailer, pr.time, pr.price_cash, pr.in_stock, TRUE AS is_change
+            FROM links l
+            JOIN prices pr ON pr.link_id = l.id
+            WHERE pr.time >= l.window_start
+              AND pr.price_cash IS NOT NULL
+        )
+        SELECT
+            date_bin(make_interval(secs => p_bucket_seconds), o.time, TIMESTAMPTZ '2000-01-01'),
+            o.retailer,
+            MIN(o.price_cash),
+            MAX(o.price_cash),
+            ROUND(AVG(o.price_cash), 2),
+            (ARRAY_AGG(o.price_cash ORDER BY o.time DESC, o.is_change DESC))[1],
+            (ARRAY_AGG(o.in_stock ORDER BY o.time DESC, o.is_change DESC))[1],
+            COUNT(*) FILTER (WHERE o.is_change)
+        FROM observations o
+        GROUP BY 1, 2
+        ORDER BY 2, 1;
+        RETURN;
+    END IF;
+
+    -- Each rollup bucket lies inside one result bucket: both grids start at midnight
+    RETURN QUERY EXECUTE format($query$
+        WITH links AS (
+            SELECT rl.id, r.name::TEXT AS retailer, NOW() - make_interval(days => $2) AS window_start
+            FROM products p
+            JOIN retailer_links rl ON rl.product_id = p.id
+            JOIN retailers r ON r.id = rl.retailer_id
+            WHERE p.slug = $1
+              AND ($4 IS NULL OR r.name = $4)
+        ),
+        rollups AS (
+            -- The price each link held going into the window, weighted as one row
+            SELECT l.retailer, l.window_start AS bucket,
+                   seed.last_price AS min_price, seed.last_price AS max_price, seed.last_price AS avg_price,
+                   seed.last_price, seed.last_in_stock, 1::BIGINT AS weight, 0::BIGINT AS changes
+            FROM links l
+            CROSS JOIN LATERAL (
+                SELECT a.last_price, a.last_in_stock
+                FROM %1$I a
+                WHERE a.link_id = l.id
+                  AND a.bucket < l.window_start
+                  AND a.last_price IS NOT NULL
+                ORDER BY a.bucket DESC
+                LIMIT 1
+            ) seed
+            UNION ALL
+            SELECT l.retailer, a.bucket, a.min_price, a.max_price, a.avg_price,
+                   a.last_price, a.last_in_stock, a.observations, a.observations
+            FROM links l
+            JOIN %1$I a ON a.link_id = l.id
+            WHERE a.bucket >= l.window_start
+              AND a.min_price IS NOT NULL
+        )
+        SELECT
+            date_bin(make_interval(secs => $3), o.bucket, TIMESTAMPTZ '2000-01-01'),
+            o.retailer,
+            MIN(o.min_price),
+            MAX(o.max_price),
+            ROUND(SUM(o.avg_price * o.weight) / SUM(o.weight), 2),
+            (ARRAY_AGG(o.last_price ORDER BY o.bucket DESC, o.changes DESC) FILTER (WHERE o.last_price IS NOT NULL))[1],
+            (ARRAY_AGG(o.last_in_stock ORDER BY o.bucket DESC, o.changes DESC))[1],
+            SUM(o.changes)::BIGINT
+        FROM rollups o
+        GROUP BY 1, 2
+        ORDER BY 2, 1
+    $query$, v_rollup)
+    USING p_slug, p_days, p_bucket_seconds, p_retailer;
+END;
+$$;
+
+COMMENT ON FUNCTION get_price_history_buckets IS 'Per-retailer min/max/avg/last price of a product in fixed time buckets over the last p_days, from the hourly or daily rollups when the buckets are whole hours or days';
@@ -83,13 +83,22 @@ class ScraperLog(Base):
     execution_time_ms = Column(Integer)
     scraped_at = Column(DateTime, default=datetime.utcnow)
 
-# Database connection
+# Database connection (engine created on first use, so importing the models needs no database)
 DATABASE_URL = os.getenv('DATABASE_URL')
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+_engine = None
+
+def get_engine():
+    """Shared engine, created on first use"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL)
+        SessionLocal.configure(bind=_engine)
+    return _engine
 
 def get_db():
     """Dependency for FastAPI"""
+    get_engine()
     db = SessionLocal()
     try:
         yield db
@@ -98,4 +107,4 @@ def get_db():
 
 def init_db():
     """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
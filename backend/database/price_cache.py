@@ -0,0 +1,216 @@
+"""
+In-process snapshot of the latest_prices view
+Read endpoints share one copy of the catalog instead of querying Supabase per request
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from database.search_index import TrigramIndex
+
+# Prices only change when a scrape finishes, so a few minutes of staleness is fine.
+# Scrapers run in other processes: API workers reload early only when a new snapshot
+# file appears (PRICE_SNAPSHOT_PATH); without one, this TTL is the only freshness bound
+DEFAULT_TTL_SECONDS = int(os.getenv('PRICE_CACHE_TTL_SECONDS', '300'))
+# After a failed reload, keep serving the old rows this long before trying the database again
+RELOAD_RETRY_SECONDS = float(os.getenv('PRICE_CACHE_RETRY_SECONDS', '10'))
+
+
+class LatestPriceSnapshot:
+    """Versioned, TTL-bound copy of every row in latest_prices"""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS, retry_seconds: float = RELOAD_RETRY_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self._rows: Sequence[Dict] = []
+        # Built from _rows on first use (see _row_positions and _search_loaded)
+        self._positions: Optional[Dict[Tuple, int]] = None
+        self._index_current = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+        self._index = TrigramIndex()
+        self._index_lock = threading.Lock()
+        self._listeners: List[Callable[[List[Dict]], None]] = []
+        self._retry_at = 0.0
+        self._last_error: Optional[Exception] = None
+
+    def is_fresh(self) -> bool:
+        """Check whether the snapshot can be served without reloading"""
+        if self.loaded_at is None:
+            return False
+        return (time.monotonic() - self.loaded_at) < self.ttl_seconds
+
+    def _should_reload(self) -> bool:
+        """Stale, and not within the cool-down after a failed reload"""
+        return not self.is_fresh() and time.monotonic() >= self._retry_at
+
+    def get_rows(self, loader: Callable[[], List[Dict]]) -> List[Dict]:
+        """Return the snapshot rows (newest first), reloading via loader when stale"""
+        if self._should_reload():
+            with self._lock:
+                # Another thread may have reloaded while we waited
+                if self._should_reload():
+                    generation = self._generation
+                    try:
+                        self.replace(loader(), generation)
+                    except Exception as e:
+                        self._reload_failed(e)
+        return self._loaded_rows()
+
+    async def get_rows_async(self, loader: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+        """Async variant of get_rows; concurrent callers share a single reload"""
+        if self._should_reload():
+            async with self._async_lock:
+                if self._should_reload():
+                    generation = self._generation
+                    try:
+                        self.replace(await loader(), generation)
+                    except Exception as e:
+                        self._reload_failed(e)
+        return self._loaded_rows()
+
+    def _reload_failed(self, error: Exception):
+        """Keep serving the previous snapshot and hold off the next reload for a while"""
+        self._retry_at = time.monotonic() + self.retry_seconds
+        self._last_error = error
+        print(f"Error refreshing latest prices snapshot: {error}")
+
+    def _loaded_rows(self) -> Sequence[Dict]:
+        """The current rows; fails with the last reload error if there has never been a snapshot"""
+        if self.version == 0 and self._last_error is not None:
+            raise self._last_error
+        return self._rows
+
+    def search(self, loader: Callable[[], List[Dict]], query: str) -> List[Dict]:
+        """Rows whose product name or model contains query (newest first)"""
+        self.get_rows(loader)
+        return self._search_loaded(query)
+
+    async def search_async(self, loader: Callable[[], Awaitable[List[Dict]]], query: str) -> List[Dict]:
+        """Async variant of search"""
+        await self.get_rows_async(loader)
+        return self._search_loaded(query)
+
+    def _search_loaded(self, query: str) -> List[Dict]:
+        """Search the rows currently held by the snapshot"""
+        with self._index_lock:
+            if not self._index_current:
+                # Only products that appeared, disappeared or were renamed get re-indexed
+                self._index.sync({
+                    self._row_key(row): f"{row.get('product_name') or ''}\n{row.get('model') or ''}"
+                    for row in self._rows
+                })
+                self._index_current = True
+            keys = self._index.search(query)
+            rows = self._rows
+            positions = self._row_positions()
+            matches = sorted(positions[key] for key in keys)
+        return [rows[i] for i in matches]
+
+    def _row_positions(self) -> Dict[Tuple, int]:
+        """Row key -> index into _rows, built on first use (call with _index_lock held)"""
+        if self._positions is None:
+            self._positions = {self._row_key(row): i for i, row in enumerate(self._rows)}
+        return self._positions
+
+    def replace(self, rows: Sequence[Dict], generation: Optional[int] = None):
+        """Swap in a freshly loaded set of rows"""
+        # A mapped snapshot file is written in serving order; sorting would copy it into memory
+        if not getattr(rows, 'presorted', False):
+            rows = sorted(rows, key=lambda r: r.get('last_updated') or '', reverse=True)
+
+        # Diff against the outgoing rows only when someone is listening (never on the first load)
+        changes = self._diff(rows) if self._listeners and self.version else []
+
+        with self._index_lock:
+            # Positions and the search index are per-worker heap, so they're only
+            # rebuilt when a search or diff needs them; serving pages of rows from
+            # a mapped file never decodes the rest of it
+            self._rows = rows
+            self._positions = None
+            self._index_current = False
+        self.version += 1
+        self._retry_at = 0.0
+        self._last_error = None
+        # An invalidation during the load means these rows may already be stale
+        if generation is None or generation == self._generation:
+            self.loaded_at = time.monotonic()
+
+        if changes:
+            for listener in list(self._listeners):
+                try:
+                    listener(changes)
+                except Exception as e:
+                    print(f"Error notifying price change listener: {e}")
+
+    def _diff(self, rows: List[Dict]) -> List[Dict]:
+        """Price or stock changes between the current rows and rows, plus rows that disappeared"""
+        with self._index_lock:
+            old_rows = self._rows
+            positions = self._row_positions()
+
+        changes = []
+        seen = set()
+        for row in rows:
+            key = self._row_key(row)
+            seen.add(key)
+            position = positions.get(key)
+            old = old_rows[position] if position is not None else None
+            if old is not None and old.get('price_cash') == row.get('price_cash') and old.get('in_stock') == row.get('in_stock'):
+                continue
+            changes.append(self._change(old, row))
+
+        # A deactivated link or deleted product simply drops out of latest_prices
+        for key, position in positions.items():
+            if key not in seen:
+                changes.append(self._change(old_rows[position], None))
+        return changes
+
+    @staticmethod
+    def _change(old: Optional[Dict], new: Optional[Dict]) -> Dict:
+        """One change event; new is None when the row was removed"""
+        current = new or old
+        return {
+            'product_id': current.get('product_id'),
+            'slug': current.get('slug'),
+            'product_name': current.get('product_name'),
+            'retailer': current.get('retailer_name'),
+            'old_price': old.get('price_cash') if old else None,
+            'new_price': new.get('price_cash') if new else None,
+            'old_in_stock': old.get('in_stock') if old else None,
+            'in_stock': new.get('in_stock') if new else None,
+            'stock_status': new.get('stock_status') if new else None,
+            'last_updated': current.get('last_updated'),
+            'removed': new is None
+        }
+
+    def add_listener(self, listener: Callable[[List[Dict]], None]):
+        """Call listener with the list of changed or removed rows after every reload that changes prices"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[List[Dict]], None]):
+        """Stop notifying listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @staticmethod
+    def _row_key(row: Dict) -> Tuple:
+        """One entry per product per retailer, as in latest_prices"""
+        return (row.get('product_id'), row.get('retailer_name'))
+
+    def invalidate(self):
+        """Force the next read to reload (called when a new snapshot file is published)"""
+        self._generation += 1
+        self.loaded_at = None
+        # New prices were just published, so the database is reachable again
+        self._retry_at = 0.0
+
+
+# Shared by every DatabaseManager in this process
+latest_prices_snapshot = LatestPriceSnapshot()
@@ -0,0 +1,38 @@
+"""
+Small keyed cache for read-mostly query results
+Each entry carries its own expiry so callers can align it with data boundaries
+"""
+
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class QueryCache:
+    """Query results keyed by their parameters, each with an absolute expiry time"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at:
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float):
+        """Store value until expires_at (a time.time() timestamp)"""
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            # Evict the entry closest to expiry
+            oldest = min(self._entries, key=lambda k: self._entries[k][0])
+            self._entries.pop(oldest, None)
+        self._entries[key] = (expires_at, value)
+
+    def invalidate(self):
+        """Drop every entry (called when the underlying rows change)"""
+        self._entries.clear()
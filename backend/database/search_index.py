@@ -0,0 +1,95 @@
+"""
+Trigram search index for phone-model lookups
+Answers substring queries over the whole catalog without scanning every row
+"""
+
+from typing import Dict, Hashable, List, Set
+
+
+def normalize_model_text(text: str) -> str:
+    """Lowercase, treat hyphens as spaces and collapse whitespace"""
+    return ' '.join((text or '').lower().replace('-', ' ').split())
+
+
+def normalize_document(text: str) -> str:
+    """Normalize each line separately so a query never matches across fields"""
+    return '\n'.join(normalize_model_text(line) for line in (text or '').split('\n'))
+
+
+def trigrams(text: str) -> Set[str]:
+    """All 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Trigram postings keyed by document, updated one document at a time"""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._documents: Dict[Hashable, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, key: Hashable, text: str):
+        """Index (or re-index) a document; separate fields with newlines"""
+        text = normalize_document(text)
+        if self._documents.get(key) == text:
+            return
+        self.remove(key)
+        self._documents[key] = text
+        for gram in trigrams(text):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: Hashable):
+        """Drop a document from the index"""
+        text = self._documents.pop(key, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def sync(self, documents: Dict[Hashable, str]) -> int:
+        """Bring the index in line with documents, touching only what changed"""
+        changed = 0
+        for key in [k for k in self._documents if k not in documents]:
+            self.remove(key)
+            changed += 1
+        for key, text in documents.items():
+            if self._documents.get(key) != normalize_document(text):
+                self.add(key, text)
+                changed += 1
+        return changed
+
+    def search(self, query: str) -> List[Hashable]:
+        """Keys of documents containing query as a substring"""
+        query = normalize_model_text(query)
+        if not query:
+            return []
+
+        grams = trigrams(query)
+        if not grams:
+            # Too short to use the postings - check every document
+            candidates = self._documents.keys()
+        else:
+            postings = []
+            for gram in grams:
+                keys = self._postings.get(gram)
+                if not keys:
+                    return []
+                postings.append(keys)
+
+            # Intersect from the rarest trigram up so the working set stays small
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for keys in postings[1:]:
+                candidates &= keys
+                if not candidates:
+                    return []
+
+        # Trigrams can match out of order, so confirm the real substring
+        return [key for key in candidates if query in self._documents[key]]
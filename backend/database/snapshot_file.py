@@ -0,0 +1,166 @@
+"""
+Binary latest-price snapshot shared through the filesystem
+The scraper writes it once per scrape; every API worker memory-maps the same file read-only
+"""
+
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterator, List, Optional
+
+# Where the scrapers write the snapshot and the API workers read it (empty = disabled)
+PRICE_SNAPSHOT_PATH = os.getenv('PRICE_SNAPSHOT_PATH', '')
+# Scrapes run every 6 hours; a file older than two runs means publishing has stopped,
+# so readers go back to the database rather than serve it
+PRICE_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv('PRICE_SNAPSHOT_MAX_AGE_SECONDS', '43200'))
+
+MAGIC = b'MMPSNAP1'
+# magic, version (ns timestamp of the write), row count
+HEADER = struct.Struct('<8sQI')
+# String columns are stored once in a blob after the rows, as (offset, length) pairs
+STRING_FIELDS = (
+    'product_name', 'brand', 'model', 'slug', 'retailer_name',
+    'stock_status', 'promo_text', 'url', 'last_updated'
+)
+# product_id, price_cash, original_price, in_stock (-1 = unknown), then the string refs
+ROW = struct.Struct('<qddb' + 'II' * len(STRING_FIELDS))
+# Length marking a NULL string, as opposed to ''
+NULL_LENGTH = 0xFFFFFFFF
+
+
+def _sort_key(row: Dict) -> str:
+    """Newest first, the order LatestPriceSnapshot serves rows in"""
+    return row.get('last_updated') or ''
+
+
+def write_snapshot(path: str, rows: List[Dict]) -> int:
+    """Write rows to path atomically; returns the new snapshot version"""
+    rows = sorted(rows, key=_sort_key, reverse=True)
+    version = time.time_ns()
+
+    blob = bytearray()
+    interned: Dict[bytes, int] = {}
+    packed = bytearray()
+    for row in rows:
+        refs = []
+        for field in STRING_FIELDS:
+            value = row.get(field)
+            if value is None:
+                refs += [0, NULL_LENGTH]
+                continue
+            data = str(value).encode('utf-8')
+            # Brands, retailers and timestamps repeat across rows, so store each once
+            offset = interned.get(data)
+            if offset is None:
+                offset = interned[data] = len(blob)
+                blob += data
+            refs += [offset, len(data)]
+
+        in_stock = row.get('in_stock')
+        packed += ROW.pack(
+            row.get('product_id') or 0,
+            math.nan if row.get('price_cash') is None else float(row['price_cash']),
+            math.nan if row.get('original_price') is None else float(row['original_price']),
+            -1 if in_stock is None else int(bool(in_stock)),
+            *refs
+        )
+
+    # Write beside the target and rename over it, so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, version, len(rows)))
+        f.write(packed)
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return version
+
+
+class MappedRows:
+    """Read-only row sequence over a memory-mapped snapshot file, decoded on access"""
+
+    # Rows are already in snapshot order, so LatestPriceSnapshot needn't sort them
+    presorted = True
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < HEADER.size:
+                raise ValueError(f"{path} is too short to be a price snapshot file")
+            magic, self.version, self._count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a price snapshot file")
+            self._blob_start = HEADER.size + self._count * ROW.size
+            if self._blob_start > len(self._map):
+                raise ValueError(f"{path} is truncated: {self._count} rows need {self._blob_start} bytes")
+        except Exception:
+            self._map.close()
+            raise
+
+    @property
+    def age_seconds(self) -> float:
+        """Seconds since the snapshot was written"""
+        return (time.time_ns() - self.version) / 1e9
+
+    def close(self):
+        """Unmap the file"""
+        self._map.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._count):
+            yield self._row(i)
+
+    def _row(self, index: int) -> Dict:
+        """Decode one row into the format_latest_price shape"""
+        values = ROW.unpack_from(self._map, HEADER.size + index * ROW.size)
+        product_id, price_cash, original_price, in_stock = values[:4]
+        row = {
+            'product_id': product_id,
+            'price_cash': None if math.isnan(price_cash) else price_cash,
+            'original_price': None if math.isnan(original_price) else original_price,
+            'in_stock': None if in_stock < 0 else bool(in_stock),
+        }
+        refs = values[4:]
+        for i, field in enumerate(STRING_FIELDS):
+            offset, length = refs[2 * i], refs[2 * i + 1]
+            if length == NULL_LENGTH:
+                row[field] = None
+            else:
+                start = self._blob_start + offset
+                if start + length > len(self._map):
+                    raise ValueError(f"Snapshot row {index} points past the end of the file")
+                row[field] = self._map[start:start + length].decode('utf-8')
+        return row
+
+
+def open_snapshot(path: str, max_age_seconds: float = PRICE_SNAPSHOT_MAX_AGE_SECONDS) -> Optional[MappedRows]:
+    """Map the snapshot at path, or None when there is no readable snapshot younger than max_age_seconds"""
+    try:
+        mapped = MappedRows(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error opening price snapshot {path}: {e}")
+        return None
+
+    if mapped.age_seconds > max_age_seconds:
+        print(f"Price snapshot {path} is {mapped.age_seconds / 3600:.1f}h old, loading prices from the database")
+        mapped.close()
+        return None
+    return mapped
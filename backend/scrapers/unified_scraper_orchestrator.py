@@ -85,22 +85,19 @@ class UnifiedScraperOrchestrator:
 
     async def save_products_to_db(self, products: List[Dict], retailer: str) -> int:
         """Save products to Supabase database"""
-        saved_count = 0
+        normalized_products = []
 
         for product in products:
             try:
                 # Normalize product data
-                normalized = self.normalize_product_data(product, retailer)
-
-                # Save to database
-                success = await self.db.save_scraped_product(normalized)
-                if success:
-                    saved_count += 1
+                normalized_products.append(self.normalize_product_data(product, retailer))
 
             except Exception as e:
-                print(f"[ERROR] Failed to save product {product.get('name')}: {e}")
+                print(f"[ERROR] Failed to normalize product {product.get('name')}: {e}")
 
-        return saved_count
+        # Save to database in a few bulk requests; this also republishes the price
+        # snapshot, and refreshes retailer stats when any price changed
+        return await self.db.save_scraped_products(normalized_products)
 
     def normalize_product_data(self, product: Dict, retailer: str) -> Dict:
         """Normalize product data for database storage"""
@@ -0,0 +1,9 @@
+"""
+Shared pytest setup for the backend unit tests
+Puts the backend directory on sys.path, the same way the app modules import each other
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
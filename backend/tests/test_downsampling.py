@@ -0,0 +1,42 @@
+"""
+Tests for LTTB chart downsampling
+"""
+
+from utils.downsampling import lttb
+
+
+def series(n):
+    return [(i, (i * 37) % 11) for i in range(n)]
+
+
+def sample(points, threshold):
+    return lttb(points, threshold, x=lambda p: p[0], y=lambda p: p[1])
+
+
+def test_keeps_first_and_last_points():
+    points = series(100)
+    sampled = sample(points, 10)
+    assert sampled[0] == points[0]
+    assert sampled[-1] == points[-1]
+
+
+def test_cuts_to_threshold_in_x_order():
+    points = series(1000)
+    sampled = sample(points, 50)
+    assert len(sampled) == 50
+    assert [p[0] for p in sampled] == sorted(p[0] for p in sampled)
+    assert all(p in points for p in sampled)
+
+
+def test_short_series_and_tiny_threshold_are_returned_whole():
+    points = series(20)
+    assert sample(points, 20) == points
+    assert sample(points, 50) == points
+    assert sample(points, 2) == points
+    assert sample([], 10) == []
+
+
+def test_keeps_a_lone_spike():
+    points = [(i, 100.0) for i in range(200)]
+    points[120] = (120, 10.0)
+    assert (120, 10.0) in sample(points, 20)
@@ -0,0 +1,161 @@
+"""
+Tests for the Supabase ingest path: change detection and bulk save counts
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from database.db_manager_supabase import DatabaseManager, _same_value, price_changed
+from database.identity_map import IngestIdentityMap
+
+
+class FakeTable:
+    """Just enough of the supabase-py query builder for the ingest path"""
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self.action = None
+
+    def upsert(self, rows, on_conflict=None):
+        self.action = ('upsert', rows, on_conflict.split(','))
+        return self
+
+    def insert(self, rows, returning=None):
+        self.action = ('insert', rows, None)
+        return self
+
+    def select(self, columns):
+        self.action = ('select', columns, None)
+        return self
+
+    def in_(self, column, values):
+        self.filter = (column, set(values))
+        return self
+
+    def execute(self):
+        kind, rows, keys = self.action
+        self.client.requests.append((kind, self.name))
+        table = self.client.tables.setdefault(self.name, [])
+        if kind == 'select':
+            column, values = self.filter
+            return SimpleNamespace(data=[row for row in table if row[column] in values])
+        if kind == 'insert':
+            table.extend(rows)
+            if self.name == 'prices':
+                current = self.client.tables.setdefault('current_prices', [])
+                for row in rows:
+                    current[:] = [c for c in current if c['link_id'] != row['link_id']]
+                    current.append(dict(row))
+            return SimpleNamespace(data=[])
+
+        written = []
+        for row in rows:
+            existing = next((r for r in table if all(r[k] == row[k] for k in keys)), None)
+            if existing is None:
+                existing = {'id': len(table) + 1}
+                table.append(existing)
+            existing.update(row)
+            written.append(dict(existing))
+        return SimpleNamespace(data=written)
+
+
+class FakeClient:
+    def __init__(self):
+        self.tables = {}
+        self.requests = []
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+@pytest.fixture
+def manager():
+    manager = DatabaseManager.__new__(DatabaseManager)
+    manager.client = FakeClient()
+    manager.identity_map = IngestIdentityMap()
+    manager.identity_map.loaded = True
+    return manager
+
+
+def entry(slug: str, price_cash, retailer_id: int = 1, in_stock: bool = True):
+    return {
+        'retailer_id': retailer_id,
+        'product': {'name': slug.title(), 'brand': 'Samsung', 'model': slug, 'variant': '', 'slug': slug},
+        'link': {'scraped_name': slug},
+        'price': {'price_cash': price_cash, 'in_stock': in_stock, 'stock_status': 'in_stock'}
+    }
+
+
+def test_same_value_treats_numeric_forms_alike():
+    assert _same_value(12999, '12999.00')
+    assert _same_value(12999.0, 12999)
+    assert not _same_value(12999, 13999)
+    assert not _same_value(None, 0)
+    # Stock flags are compared as they are, not through float()
+    assert not _same_value(True, False)
+    assert not _same_value(False, None)
+    assert _same_value('Promo', 'Promo')
+
+
+def test_price_changed_only_compares_scraped_columns():
+    last = {'price_cash': '12999.00', 'in_stock': True, 'promo_text': 'Sale'}
+    assert price_changed({'price_cash': 12999, 'in_stock': True}, None)
+    # promo_text wasn't scraped, so the stored one doesn't count
+    assert not price_changed({'price_cash': 12999, 'in_stock': True}, last)
+    assert price_changed({'price_cash': 12999, 'in_stock': False}, last)
+    assert price_changed({'price_cash': 11999, 'in_stock': True}, last)
+
+
+def test_bulk_save_counts_links_after_duplicates_collapse(manager):
+    saved, changed = manager._bulk_save([
+        entry('galaxy-s24', 45990),
+        entry('galaxy-s24', 44990),  # Same product and retailer: the later listing wins
+        entry('galaxy-s24', 45990, retailer_id=2),
+        entry('iphone-15', 52990),
+    ])
+
+    assert (saved, changed) == (3, 3)
+    assert len(manager.client.tables['retailer_links']) == 3
+    assert sorted(p['price_cash'] for p in manager.client.tables['prices']) == [44990, 45990, 52990]
+
+
+def test_bulk_save_writes_prices_only_for_changes(manager):
+    manager._bulk_save([entry('galaxy-s24', 45990), entry('iphone-15', 52990)])
+
+    saved, changed = manager._bulk_save([entry('galaxy-s24', '45990.00'), entry('iphone-15', 49990)])
+
+    assert (saved, changed) == (2, 1)
+    assert [p['price_cash'] for p in manager.client.tables['prices']] == [45990, 52990, 49990]
+
+
+def test_snapshot_is_published_after_every_save(manager):
+    manager.identity_map.retailers['Courts'] = 1
+    manager.refresh_retailer_stats = lambda name: calls.append(f"stats {name}")
+    manager.publish_price_snapshot = lambda: calls.append('publish')
+    product = {'retailer': 'Courts', 'name': 'Galaxy S24', 'brand': 'Samsung', 'model': 'S24', 'price_cash': 45990}
+
+    calls = []
+    assert asyncio.run(manager.save_scraped_products([product])) == 1
+    assert calls == ['stats Courts', 'publish']
+
+    # Nothing changed: only the snapshot is republished
+    calls = []
+    assert asyncio.run(manager.save_scraped_products([product])) == 1
+    assert calls == ['publish']
+
+
+def test_retailers_missing_from_the_map_are_looked_up_then_upserted(manager):
+    # Created by another scraper after this process loaded its identity map
+    manager.client.tables['retailers'] = [{'id': 1, 'name': 'Courts', 'website_url': ''}]
+
+    retailer_ids = manager._resolve_retailers([
+        {'retailer': 'Courts'},
+        {'retailer': 'Galaxy', 'url': 'https://galaxy.mu/product/s24'},
+    ])
+
+    assert retailer_ids == {'Courts': 1, 'Galaxy': 2}
+    assert ('insert', 'retailers') not in manager.client.requests
+    assert manager.client.tables['retailers'][1]['website_url'] == 'https://galaxy.mu'
@@ -0,0 +1,118 @@
+"""
+Tests for the AsyncDatabaseManager product reads: keyset paging and slug filters
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from database.db_manager_async import AsyncDatabaseManager
+
+
+def latest_prices(products: int, retailers: int):
+    """One latest_prices row per product per retailer; the cheapest retailer varies"""
+    return [
+        {
+            'product_id': product_id,
+            'product_name': f"Phone {product_id}",
+            'brand': 'Samsung',
+            'model': f"M{product_id}",
+            'slug': f"phone-{product_id}",
+            'retailer_id': retailer_id,
+            'retailer': f"R{retailer_id}",
+            'price': 1000.0 + (product_id + retailer_id) % retailers,
+            'in_stock': True,
+            'url': None
+        }
+        for product_id in range(1, products + 1)
+        for retailer_id in range(1, retailers + 1)
+    ]
+
+
+def select(rows, params):
+    """The subset of PostgREST filtering list_products uses, ordered by (product_id, retailer_id)"""
+    matched = sorted(rows, key=lambda r: (r['product_id'], r['retailer_id']))
+    limit = None
+    for name, value in params:
+        if name == 'limit':
+            limit = int(value)
+        elif name == 'product_id':
+            cursor = int(value.split('.', 1)[1])
+            matched = [r for r in matched if r['product_id'] > cursor]
+        elif name == 'or':
+            product_id, _, retailer_id = map(int, re.findall(r'\d+', value)[:3])
+            matched = [
+                r for r in matched
+                if (r['product_id'], r['retailer_id']) > (product_id, retailer_id)
+            ]
+    return matched[:limit]
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """AsyncDatabaseManager whose latest_prices reads are served from a list"""
+    monkeypatch.setenv('SUPABASE_URL', 'http://supabase.test')
+    monkeypatch.setenv('SUPABASE_ANON_KEY', 'test-key')
+    manager = AsyncDatabaseManager()
+    manager.requests = []
+
+    async def fake_select(table, params):
+        manager.requests.append(params)
+        return select(manager.rows, params)
+
+    manager._select = fake_select
+    yield manager
+    asyncio.run(manager.close())
+
+
+def test_pages_round_trip_through_the_cursor(manager):
+    manager.rows = latest_prices(products=25, retailers=3)
+
+    seen = []
+    cursor = None
+    while True:
+        page = asyncio.run(manager.list_products(limit=10, cursor=cursor))
+        seen.extend(product['id'] for product in page['products'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+        assert cursor == page['products'][-1]['id']
+
+    assert seen == list(range(1, 26))
+
+
+def test_products_group_every_retailer_row(manager):
+    # Chunks of max(limit * 4, 50) rows split products across requests
+    manager.rows = latest_prices(products=30, retailers=7)
+
+    page = asyncio.run(manager.list_products(limit=20))
+
+    assert len(manager.requests) > 1
+    assert [p['id'] for p in page['products']] == list(range(1, 21))
+    for product in page['products']:
+        prices = [r['price'] for r in manager.rows if r['product_id'] == product['id']]
+        assert product['best_price'] == min(prices)
+    assert page['next_cursor'] == 20
+
+
+def test_oversize_limit_is_clamped(manager):
+    manager.rows = latest_prices(products=150, retailers=1)
+
+    page = asyncio.run(manager.list_products(limit=500))
+
+    assert len(page['products']) == 100
+    assert page['next_cursor'] == 100
+
+
+def test_slug_filter_quotes_every_value(manager):
+    captured = []
+
+    async def capture(table, params):
+        captured.append(params)
+        return []
+
+    manager._select = capture
+    asyncio.run(manager.get_products_by_slugs(['galaxy-s24', 'odd,"slug"\\x']))
+
+    assert captured[0]['slug'] == 'in.("galaxy-s24","odd,\\"slug\\"\\\\x")'
@@ -0,0 +1,66 @@
+"""
+Tests for the change events LatestPriceSnapshot hands the price stream
+"""
+
+from database.price_cache import LatestPriceSnapshot
+
+
+def row(product_id: int, retailer: str, price, in_stock=True, minute: int = 0):
+    return {
+        'product_id': product_id,
+        'slug': f"phone-{product_id}",
+        'product_name': f"Phone {product_id}",
+        'retailer_name': retailer,
+        'price_cash': price,
+        'in_stock': in_stock,
+        'stock_status': 'in_stock' if in_stock else 'out_of_stock',
+        'last_updated': f"2026-01-01T00:{minute:02d}:00+00:00"
+    }
+
+
+def test_changed_added_and_removed_rows():
+    snapshot = LatestPriceSnapshot()
+    events = []
+    snapshot.add_listener(events.append)
+
+    snapshot.replace([
+        row(1, 'Courts', 100.0),
+        row(2, 'Courts', 200.0),
+        row(3, 'Galaxy', 300.0),
+    ])
+    # The first load is not a change
+    assert events == []
+
+    snapshot.replace([
+        row(1, 'Courts', 100.0, minute=5),        # same price and stock: no event
+        row(2, 'Courts', 180.0, minute=5),        # price drop
+        row(3, 'Galaxy', 300.0, in_stock=False),  # went out of stock
+        row(4, 'Galaxy', 400.0),                  # new listing
+    ])
+
+    assert len(events) == 1
+    changes = {(c['product_id'], c['retailer']): c for c in events[0]}
+    assert set(changes) == {(2, 'Courts'), (3, 'Galaxy'), (4, 'Galaxy')}
+
+    assert changes[(2, 'Courts')]['old_price'] == 200.0
+    assert changes[(2, 'Courts')]['new_price'] == 180.0
+    assert changes[(3, 'Galaxy')]['old_in_stock'] is True
+    assert changes[(3, 'Galaxy')]['in_stock'] is False
+    assert changes[(4, 'Galaxy')]['old_price'] is None
+    assert not any(c['removed'] for c in changes.values())
+
+    snapshot.replace([row(2, 'Courts', 180.0), row(4, 'Galaxy', 400.0)])
+
+    removed = events[1]
+    assert sorted((c['product_id'], c['retailer']) for c in removed) == [(1, 'Courts'), (3, 'Galaxy')]
+    assert all(c['removed'] and c['new_price'] is None for c in removed)
+    assert next(c for c in removed if c['product_id'] == 1)['old_price'] == 100.0
+
+
+def test_no_listener_means_no_diff():
+    snapshot = LatestPriceSnapshot()
+    snapshot.replace([row(1, 'Courts', 100.0)])
+    snapshot.replace([row(1, 'Courts', 90.0)])
+
+    # Positions are only built when a diff or search needs them
+    assert snapshot._positions is None
@@ -0,0 +1,77 @@
+"""
+Tests for AsyncDatabaseManager.get_price_history over change-only price rows
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.db_manager_async import AsyncDatabaseManager
+
+
+def bucket(days_ago: float, retailer: str, price: float, changes: int, in_stock: bool = True):
+    start = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return {
+        'bucket': start.replace(minute=0, second=0, microsecond=0).isoformat(),
+        'retailer': retailer,
+        'min_price': price,
+        'max_price': price,
+        'avg_price': price,
+        'last_price': price,
+        'in_stock': in_stock,
+        'changes': changes
+    }
+
+
+@pytest.fixture
+def price_history(monkeypatch):
+    """get_price_history over canned get_price_history_buckets rows"""
+    monkeypatch.setenv('SUPABASE_URL', 'http://supabase.test')
+    monkeypatch.setenv('SUPABASE_ANON_KEY', 'test-key')
+
+    def run(buckets, **kwargs):
+        manager = AsyncDatabaseManager()
+
+        async def rpc(function, args=None):
+            return buckets
+
+        manager._rpc = rpc
+        try:
+            return asyncio.run(manager.get_price_history('galaxy-s24', **kwargs))
+        finally:
+            asyncio.run(manager.close())
+
+    return run
+
+
+def test_price_held_for_the_whole_window(price_history):
+    # Only the seed row from before the window: no changes, but the price is known
+    result = price_history([bucket(30, 'Courts', 45990.0, changes=0)], days=30)
+
+    stats = result['statistics']
+    assert stats['current_price'] == 45990.0
+    assert stats['average_price'] == 45990.0
+    assert stats['price_changes'] == 0
+    # Carried forward to now, so the chart spans the window
+    assert [p['price'] for p in result['history']] == [45990.0, 45990.0]
+
+
+def test_average_is_weighted_by_time_held(price_history):
+    result = price_history([
+        bucket(10, 'Courts', 100.0, changes=0),
+        bucket(2, 'Courts', 200.0, changes=1),
+    ], days=10)
+
+    stats = result['statistics']
+    assert stats['price_changes'] == 1
+    assert stats['current_price'] == 200.0
+    # 8 days at 100 and 2 days at 200, rather than one row of each
+    assert abs(stats['average_price'] - 120.0) < 1.0
+
+
+def test_no_prices_at_all(price_history):
+    result = price_history([])
+    assert result['history'] == []
+    assert result['statistics'] is None
+
@@ -0,0 +1,65 @@
+"""
+Tests for the /api/promotions/active response built by AsyncDatabaseManager
+"""
+
+import asyncio
+
+import pytest
+
+from database.db_manager_async import AsyncDatabaseManager
+from database.price_cache import LatestPriceSnapshot
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """AsyncDatabaseManager with canned promotions rows and an in-memory price snapshot"""
+    monkeypatch.setenv('SUPABASE_URL', 'http://supabase.test')
+    monkeypatch.setenv('SUPABASE_ANON_KEY', 'test-key')
+    manager = AsyncDatabaseManager()
+    manager.snapshot_path = None
+    manager.price_cache = LatestPriceSnapshot()
+    manager.price_cache.replace([
+        {'product_id': 7, 'retailer_name': 'Courts', 'price_cash': 39990.0, 'original_price': 45990.0,
+         'last_updated': '2026-01-01T00:00:00+00:00'},
+        {'product_id': 7, 'retailer_name': 'Galaxy', 'price_cash': 41990.0, 'original_price': None,
+         'last_updated': '2026-01-01T00:00:00+00:00'},
+    ])
+
+    async def fake_select(table, params):
+        return [
+            {
+                'id': 1, 'promo_type': 'flash_sale', 'description': 'Weekend only',
+                'discount_amount': 6000, 'discount_percentage': 13, 'start_date': '2026-01-01',
+                'end_date': None, 'source': 'website', 'source_url': None, 'created_at': '2026-01-01T00:00:00+00:00',
+                'products': {'id': 7, 'name': 'Galaxy S24', 'brand': 'Samsung', 'model': 'S24', 'slug': 'galaxy-s24'},
+                'retailers': {'name': 'Courts'}
+            },
+            {
+                'id': 2, 'promo_type': None, 'description': None, 'discount_amount': None,
+                'discount_percentage': None, 'start_date': None, 'end_date': None, 'source': None,
+                'source_url': None, 'created_at': '2026-01-01T00:00:00+00:00',
+                'products': {'id': 8, 'name': 'iPhone 15', 'brand': 'Apple', 'model': '15', 'slug': 'iphone-15'},
+                'retailers': {'name': 'Courts'}
+            },
+        ]
+
+    manager._select = fake_select
+    yield manager
+    asyncio.run(manager.close())
+
+
+def test_promotions_have_the_fields_the_frontend_reads(manager):
+    result = asyncio.run(manager.get_active_promotions())
+
+    assert result['total_count'] == result['count'] == 2
+    promo, unpriced = result['promotions']
+    assert promo['title'] == 'Flash Sale'
+    assert promo['retailer'] == 'Courts'
+    # The listing's current price at the promoting retailer, not another retailer's
+    assert promo['discounted_price'] == 39990.0
+    assert promo['original_price'] == 45990.0
+    assert promo['valid_from'] == '2026-01-01'
+
+    assert unpriced['title'] == 'Promotion'
+    assert unpriced['discounted_price'] is None
+    assert unpriced['original_price'] is None
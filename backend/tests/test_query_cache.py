@@ -0,0 +1,41 @@
+"""
+Tests for the expiring query result cache
+"""
+
+import time
+
+from database.query_cache import QueryCache
+
+
+def test_value_served_until_expiry():
+    cache = QueryCache()
+    cache.set('a', [1], time.time() + 60)
+    assert cache.get('a') == [1]
+    cache.set('b', [2], time.time() - 1)
+    assert cache.get('b') is None
+    assert cache.get('missing') is None
+
+
+def test_full_cache_evicts_entry_closest_to_expiry():
+    cache = QueryCache(max_entries=2)
+    now = time.time()
+    cache.set('soon', 1, now + 10)
+    cache.set('later', 2, now + 100)
+    cache.set('new', 3, now + 50)
+    assert cache.get('soon') is None
+    assert cache.get('later') == 2
+    assert cache.get('new') == 3
+
+
+def test_overwriting_a_key_does_not_evict():
+    cache = QueryCache(max_entries=1)
+    cache.set('a', 1, time.time() + 10)
+    cache.set('a', 2, time.time() + 10)
+    assert cache.get('a') == 2
+
+
+def test_invalidate_drops_everything():
+    cache = QueryCache()
+    cache.set('a', 1, time.time() + 60)
+    cache.invalidate()
+    assert cache.get('a') is None
@@ -0,0 +1,91 @@
+"""
+Tests for the token-bucket rate limiter and client identification
+"""
+
+import ipaddress
+
+from api import rate_limit
+from api.auth import create_access_token
+from api.rate_limit import TokenBucketLimiter, client_key, route_group
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(monkeypatch, per_minute=60, burst=3, max_clients=100):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', clock)
+    limiter = TokenBucketLimiter({'default': (per_minute / 60, burst)}, max_clients=max_clients)
+    return limiter, clock
+
+
+def test_burst_then_retry_after(monkeypatch):
+    limiter, _ = make_limiter(monkeypatch, per_minute=60, burst=3)
+    assert [limiter.acquire('default', 'a') for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire('default', 'a') == 1.0
+    # Other clients have their own bucket
+    assert limiter.acquire('default', 'b') == 0
+
+
+def test_tokens_refill_over_time_up_to_burst(monkeypatch):
+    limiter, clock = make_limiter(monkeypatch, per_minute=60, burst=3)
+    for _ in range(3):
+        limiter.acquire('default', 'a')
+    clock.now += 1.5
+    assert limiter.acquire('default', 'a') == 0
+    assert limiter.acquire('default', 'a') > 0
+
+    clock.now += 3600
+    assert [limiter.acquire('default', 'a') for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire('default', 'a') > 0
+
+
+def test_least_recently_used_client_is_dropped(monkeypatch):
+    limiter, _ = make_limiter(monkeypatch, burst=1, max_clients=2)
+    limiter.acquire('default', 'a')
+    limiter.acquire('default', 'b')
+    limiter.acquire('default', 'c')
+    # 'a' was evicted, so it starts with a full bucket again
+    assert limiter.acquire('default', 'a') == 0
+    assert limiter.acquire('default', 'c') > 0
+
+
+def test_route_groups_and_exempt_paths():
+    assert route_group('/api/phones/live-price') == 'live_price'
+    assert route_group('/api/export/products') == 'export'
+    assert route_group('/api/products') == 'default'
+    assert route_group('/api/health/ready') is None
+    assert route_group('/metrics') is None
+
+
+def scope(client='203.0.113.7', **headers):
+    return {
+        'client': (client, 50000),
+        'headers': [(k.replace('_', '-').encode(), v.encode()) for k, v in headers.items()],
+    }
+
+
+def test_unverified_tokens_fall_back_to_ip():
+    assert client_key(scope(authorization='Bearer not-a-jwt')) == 'ip:203.0.113.7'
+    assert client_key(scope(authorization='Bearer another-one')) == 'ip:203.0.113.7'
+    assert client_key(scope(x_api_key='anything')) == 'ip:203.0.113.7'
+
+
+def test_verified_token_keys_on_user():
+    token = create_access_token({'sub': 'analyst@example.com'})
+    assert client_key(scope(authorization=f'Bearer {token}')) == 'user:analyst@example.com'
+
+
+def test_forwarded_for_only_from_trusted_proxies(monkeypatch):
+    forwarded = {'x_forwarded_for': '198.51.100.1, 192.0.2.44'}
+    assert client_key(scope(client='127.0.0.1', **forwarded)) == 'ip:127.0.0.1'
+
+    monkeypatch.setattr(rate_limit, 'TRUSTED_PROXIES', [ipaddress.ip_network('127.0.0.1/32')])
+    # The rightmost hop is what our proxy saw; the rest was sent by the client
+    assert client_key(scope(client='127.0.0.1', **forwarded)) == 'ip:192.0.2.44'
+    assert client_key(scope(client='203.0.113.7', **forwarded)) == 'ip:203.0.113.7'
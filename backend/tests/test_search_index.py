@@ -0,0 +1,50 @@
+"""
+Tests for the trigram phone-model index
+"""
+
+from database.search_index import TrigramIndex
+
+
+def make_index():
+    index = TrigramIndex()
+    index.add(1, "Samsung Galaxy S24 Ultra\nS24 Ultra")
+    index.add(2, "Samsung Galaxy A15\nA15")
+    index.add(3, "Apple iPhone 15 Pro\niPhone 15 Pro")
+    return index
+
+
+def test_substring_match_is_case_and_hyphen_insensitive():
+    index = make_index()
+    assert index.search("galaxy s24") == [1]
+    assert index.search("IPHONE-15") == [3]
+    assert sorted(index.search("samsung")) == [1, 2]
+
+
+def test_trigrams_out_of_order_do_not_match():
+    index = TrigramIndex()
+    index.add(1, "abcxbcd")
+    assert index.search("abcd") == []
+
+
+def test_query_never_spans_fields():
+    index = make_index()
+    assert index.search("ultra s24") == []
+
+
+def test_short_query_falls_back_to_scan():
+    index = make_index()
+    assert sorted(index.search("a1")) == [2]
+    assert index.search("") == []
+
+
+def test_sync_reindexes_only_changes():
+    index = make_index()
+    changed = index.sync({
+        1: "Samsung Galaxy S24 Ultra\nS24 Ultra",
+        2: "Samsung Galaxy A16\nA16",
+    })
+    assert changed == 2  # 2 renamed, 3 removed
+    assert len(index) == 2
+    assert index.search("a15") == []
+    assert index.search("a16") == [2]
+    assert index.search("iphone") == []
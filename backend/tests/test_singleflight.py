@@ -0,0 +1,80 @@
+"""
+Tests for single-flight request coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from api.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def lookup():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'slug': 'galaxy-s24'}
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do('galaxy-s24', lookup) for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_different_keys_and_later_calls_run_again():
+    calls = []
+
+    async def lookup():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        flight = SingleFlight()
+        first = await asyncio.gather(flight.do('a', lookup), flight.do('b', lookup))
+        second = await flight.do('a', lookup)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert sorted(first) == [1, 2]
+    assert second == 3
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('database down')
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do('x', failing) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do('x', failing)
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(attempts) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def main():
+        flight = SingleFlight()
+        impatient = asyncio.ensure_future(flight.do('k', slow))
+        patient = asyncio.ensure_future(flight.do('k', slow))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(main()) == 'done'
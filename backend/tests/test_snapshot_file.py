@@ -0,0 +1,81 @@
+"""
+Tests for the memory-mapped latest-price snapshot file
+"""
+
+import os
+import time
+
+import pytest
+
+from database.snapshot_file import HEADER, MappedRows, open_snapshot, write_snapshot
+
+
+def make_rows():
+    return [
+        {
+            'product_id': 1, 'product_name': 'Samsung Galaxy S24', 'brand': 'Samsung', 'model': 'S24',
+            'slug': 'samsung-galaxy-s24', 'retailer_name': 'Courts', 'price_cash': 45990.0,
+            'original_price': None, 'in_stock': True, 'stock_status': 'in_stock', 'promo_text': '',
+            'url': 'https://example.com/s24', 'last_updated': '2026-01-01T10:00:00+00:00',
+        },
+        {
+            'product_id': 2, 'product_name': 'Apple iPhone 15', 'brand': 'Apple', 'model': 'iPhone 15',
+            'slug': 'apple-iphone-15', 'retailer_name': 'Galaxy', 'price_cash': None,
+            'original_price': 52990.0, 'in_stock': None, 'stock_status': None, 'promo_text': None,
+            'url': None, 'last_updated': '2026-01-02T10:00:00+00:00',
+        },
+    ]
+
+
+def test_round_trip_newest_first(tmp_path):
+    path = str(tmp_path / 'prices.snap')
+    rows = make_rows()
+    version = write_snapshot(path, rows)
+
+    mapped = MappedRows(path)
+    assert mapped.version == version
+    assert len(mapped) == 2
+    # Written in serving order, so the newer row comes first
+    assert list(mapped) == [rows[1], rows[0]]
+    assert mapped[-1] == rows[0]
+    assert mapped[0:1] == [rows[1]]
+    with pytest.raises(IndexError):
+        mapped[2]
+
+
+def test_write_leaves_no_temp_file(tmp_path):
+    path = str(tmp_path / 'prices.snap')
+    write_snapshot(path, make_rows())
+    assert os.listdir(tmp_path) == ['prices.snap']
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = str(tmp_path / 'prices.snap')
+    write_snapshot(path, make_rows())
+    with open(path, 'r+b') as f:
+        f.truncate(HEADER.size + 10)
+
+    with pytest.raises(ValueError, match='truncated'):
+        MappedRows(path)
+    assert open_snapshot(path) is None
+
+
+def test_missing_and_foreign_files(tmp_path):
+    assert open_snapshot(str(tmp_path / 'missing.snap')) is None
+
+    path = str(tmp_path / 'other.bin')
+    with open(path, 'wb') as f:
+        f.write(b'not a snapshot at all, just bytes')
+    with pytest.raises(ValueError):
+        MappedRows(path)
+    assert open_snapshot(path) is None
+
+
+def test_stale_snapshot_is_not_opened(tmp_path, monkeypatch):
+    path = str(tmp_path / 'prices.snap')
+    write_snapshot(path, make_rows())
+    assert open_snapshot(path, max_age_seconds=60) is not None
+
+    later = time.time_ns() + 120 * 10**9
+    monkeypatch.setattr(time, 'time_ns', lambda: later)
+    assert open_snapshot(path, max_age_seconds=60) is None
@@ -0,0 +1,52 @@
+"""
+Largest-Triangle-Three-Buckets downsampling for chart series
+Keeps the visual shape of a price line while cutting it to a fixed number of points
+"""
+
+from typing import Callable, List, TypeVar
+
+T = TypeVar('T')
+
+
+def lttb(points: List[T], threshold: int, x: Callable[[T], float], y: Callable[[T], float]) -> List[T]:
+    """
+    Downsample points (sorted by x) to at most threshold points
+
+    The first and last points are always kept. Every bucket in between
+    contributes the point forming the largest triangle with the previously
+    selected point and the average of the next bucket.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average point of the following bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(points))
+        if next_start >= next_end:
+            next_start, next_end = len(points) - 1, len(points)
+        following = points[next_start:next_end]
+        avg_x = sum(x(p) for p in following) / len(following)
+        avg_y = sum(y(p) for p in following) / len(following)
+
+        ax, ay = x(points[selected]), y(points[selected])
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y(points[j]) - ay) - (ax - x(points[j])) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+
+        sampled.append(points[best])
+        selected = best
+
+    sampled.append(points[-1])
+    return sampled
@@ -14,8 +14,8 @@ export interface Promotion {
   description?: string;
   discountPercentage?: number;
   originalPrice?: Price;
-  discountedPrice: Price;
-  validFrom: Date;
+  discountedPrice?: Price;
+  validFrom?: Date;
   validUntil?: Date;
   sourceUrl?: string;
 }
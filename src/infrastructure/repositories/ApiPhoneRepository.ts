@@ -12,6 +12,8 @@ export class ApiPhoneRepository implements IPhoneRepository {
   private cachedPhones: PhoneEntity[] | null = null;
   private lastFetchTime: number = 0;
   private readonly CACHE_TTL = 5 * 60 * 1000; // 5 minutes
+  private readonly PAGE_SIZE = 100; // Largest page /api/products serves
+  private readonly MAX_PRODUCTS = 500; // Stop paging past this many products
 
   /**
    * Convert API product to Phone entity format
@@ -117,8 +119,16 @@ export class ApiPhoneRepository implements IPhoneRepository {
     }
 
     try {
-      const response = await getAllProducts(500); // Fetch up to 500 products
-      const phones = response.products.map((product) => {
+      // The API serves at most PAGE_SIZE products per request; follow the cursor
+      const products: ProductListItem[] = [];
+      let cursor: number | null = null;
+      do {
+        const response = await getAllProducts(this.PAGE_SIZE, undefined, cursor);
+        products.push(...response.products);
+        cursor = response.next_cursor;
+      } while (cursor !== null && products.length < this.MAX_PRODUCTS);
+
+      const phones = products.map((product) => {
         const phoneData = this.mapApiProductToPhone(product);
         return PhoneEntity.create(phoneData);
       });
@@ -58,8 +58,12 @@ export class ApiPromotionRepository implements IPromotionRepository {
       originalPrice: apiPromotion.original_price
         ? Price.create(apiPromotion.original_price, 'MUR')
         : undefined,
-      discountedPrice: Price.create(apiPromotion.discounted_price, 'MUR'),
-      validFrom: new Date(apiPromotion.valid_from),
+      discountedPrice: apiPromotion.discounted_price
+        ? Price.create(apiPromotion.discounted_price, 'MUR')
+        : undefined,
+      validFrom: apiPromotion.valid_from
+        ? new Date(apiPromotion.valid_from)
+        : undefined,
       validUntil: apiPromotion.valid_until
         ? new Date(apiPromotion.valid_until)
         : undefined,
@@ -215,9 +215,11 @@ export function Dashboard() {
                     <p className="text-sm text-gray-600 mb-1">{promo.product_name}</p>
                     <div className="flex justify-between items-center text-xs">
                       <span className="text-gray-500">{promo.retailer}</span>
-                      <span className="font-bold text-orange-600">
-                        MUR {promo.discounted_price.toLocaleString('en-MU')}
-                      </span>
+                      {promo.discounted_price !== null && (
+                        <span className="font-bold text-orange-600">
+                          MUR {promo.discounted_price.toLocaleString('en-MU')}
+                        </span>
+                      )}
                     </div>
                   </div>
                 ))}
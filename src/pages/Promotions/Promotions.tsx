@@ -175,8 +175,8 @@ interface PromotionCardProps {
     description: string | null;
     discount_percentage: number | null;
     original_price: number | null;
-    discounted_price: number;
-    valid_from: string;
+    discounted_price: number | null;
+    valid_from: string | null;
     valid_until: string | null;
     source_url: string | null;
   };
@@ -219,25 +219,27 @@ function PromotionCard({ promotion }: PromotionCardProps) {
         </p>
       )}
 
-      {/* Pricing */}
-      <div className="mb-4">
-        <div className="flex items-baseline gap-2">
-          <span className="text-2xl font-bold text-orange-600">
-            MUR {promotion.discounted_price.toLocaleString('en-MU')}
-          </span>
-          {promotion.original_price && promotion.original_price > promotion.discounted_price && (
-            <span className="text-sm text-gray-500 line-through">
-              MUR {promotion.original_price.toLocaleString('en-MU')}
+      {/* Pricing (absent when the retailer lists no current price) */}
+      {promotion.discounted_price !== null && (
+        <div className="mb-4">
+          <div className="flex items-baseline gap-2">
+            <span className="text-2xl font-bold text-orange-600">
+              MUR {promotion.discounted_price.toLocaleString('en-MU')}
             </span>
+            {promotion.original_price && promotion.original_price > promotion.discounted_price && (
+              <span className="text-sm text-gray-500 line-through">
+                MUR {promotion.original_price.toLocaleString('en-MU')}
+              </span>
+            )}
+          </div>
+          {promotion.original_price && promotion.original_price > promotion.discounted_price && (
+            <p className="text-sm text-green-600 font-medium mt-1">
+              Save MUR{' '}
+              {(promotion.original_price - promotion.discounted_price).toLocaleString('en-MU')}
+            </p>
           )}
         </div>
-        {promotion.original_price && promotion.original_price > promotion.discounted_price && (
-          <p className="text-sm text-green-600 font-medium mt-1">
-            Save MUR{' '}
-            {(promotion.original_price - promotion.discounted_price).toLocaleString('en-MU')}
-          </p>
-        )}
-      </div>
+      )}
 
       {/* Retailer */}
       <div className="mb-4">
@@ -136,12 +136,18 @@ export interface ProductListItem {
 export interface ProductsListResponse {
   count: number;
   products: ProductListItem[];
+  next_cursor: number | null;
 }
 
-export async function getAllProducts(limit?: number, brand?: string): Promise<ProductsListResponse> {
+export async function getAllProducts(
+  limit?: number,
+  brand?: string,
+  cursor?: number | null
+): Promise<ProductsListResponse> {
   const params = new URLSearchParams();
   if (limit) params.append('limit', limit.toString());
   if (brand) params.append('brand', brand);
+  if (cursor) params.append('cursor', cursor.toString());
 
   const query = params.toString();
   return apiFetch<ProductsListResponse>(
@@ -153,6 +159,27 @@ export async function getProductBySlug(slug: string): Promise<Product> {
   return apiFetch<Product>(`/api/products/${slug}`);
 }
 
+export interface ProductDetail {
+  id: number;
+  name: string;
+  brand: string;
+  model: string;
+  variant: string | null;
+  slug: string;
+  prices: RetailerPrice[];
+}
+
+export interface ProductsBatchResponse {
+  count: number;
+  products: ProductDetail[];
+  missing: string[];
+}
+
+export async function getProductsBySlugs(slugs: string[]): Promise<ProductsBatchResponse> {
+  const params = new URLSearchParams({ slugs: slugs.join(',') });
+  return apiFetch<ProductsBatchResponse>(`/api/products/batch?${params.toString()}`);
+}
+
 export async function getBestPrice(slug: string): Promise<BestPriceResponse> {
   return apiFetch<BestPriceResponse>(`/api/products/${slug}/best-price`);
 }
@@ -177,18 +204,23 @@ export interface Promotion {
   slug: string;
   retailer: string;
   title: string;
+  promo_type: string | null;
   description: string | null;
+  discount_amount: number | null;
   discount_percentage: number | null;
+  /** The listing's current prices at this retailer; null when it has none */
   original_price: number | null;
-  discounted_price: number;
-  valid_from: string;
+  discounted_price: number | null;
+  valid_from: string | null;
   valid_until: string | null;
+  source: string | null;
   source_url: string | null;
   created_at: string;
 }
 
 export interface PromotionsResponse {
   promotions: Promotion[];
+  count: number;
   total_count: number;
 }
 
@@ -267,6 +299,37 @@ export async function getScraperLogs(limit: number = 50): Promise<ScraperLogsRes
   return apiFetch<ScraperLogsResponse>(`/api/scrapers/logs?limit=${limit}`);
 }
 
+// ==========================================
+// LIVE PRICE STREAM
+// ==========================================
+
+export interface PriceChangeEvent {
+  product_id: number;
+  slug: string;
+  product_name: string;
+  retailer: string;
+  old_price: number | null;
+  new_price: number | null;
+  old_in_stock: boolean | null;
+  in_stock: boolean | null;
+  stock_status: string | null;
+  last_updated: string | null;
+  /** The listing is gone (link deactivated or product deleted); drop it */
+  removed: boolean;
+}
+
+/**
+ * Subscribe to live price changes (server-sent events).
+ * Returns a function that closes the stream.
+ */
+export function subscribeToPriceChanges(onChange: (change: PriceChangeEvent) => void): () => void {
+  const source = new EventSource(`${API_BASE_URL}/api/stream/prices`);
+  source.addEventListener('price', (event) => {
+    onChange(JSON.parse((event as MessageEvent).data));
+  });
+  return () => source.close();
+}
+
 // ==========================================
 // UTILITY FUNCTIONS
 // ==========================================